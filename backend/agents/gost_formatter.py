@@ -1,51 +1,100 @@
-from typing import List, Dict
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
 from datetime import datetime
+from itertools import islice
+
+from agents.normalizer import CandidateNormalizer
+from models.paper import Paper
+
+BIBLIOGRAPHY_HEADER = "## Список литературы\n\n"
 
 class GOSTFormatter:
     """Format citations according to GOST standard"""
     
     @staticmethod
-    def format_article(paper: Dict) -> str:
+    def format_article(paper: Paper) -> str:
         """Format article citation in GOST style"""
         
-        # Authors
-        authors = paper['authors'][:3]
-        if len(authors) > 3:
-            authors_str = f"{authors[0]} и др."
-        else:
-            authors_str = ", ".join(authors)
+        # Authors (at most three)
+        authors_str = ", ".join(paper.authors[:3])
         
         # Title
-        title = paper['title'].replace('\n', ' ')
+        title = paper.title.replace('\n', ' ')
         
         # Year
-        year = paper['published'].year if paper['published'] else datetime.now().year
-        
-        # URL
-        url = f"URL: {paper['pdf_url']}" if paper.get('pdf_url') else ""
+        year = paper.published.year if paper.published else datetime.now().year
         
         # Journal ref
-        journal = paper.get('journal_ref', 'ArXiv preprint')
-        
-        # DOI
-        doi = f"DOI: {paper['doi']}" if paper.get('doi') else ""
+        journal = paper.journal_ref or 'ArXiv preprint'
         
-        # Format according to GOST
+        # Format according to GOST, with optional DOI and URL
         citation = f"{authors_str} {title} // {journal}. — {year}."
-        
-        if doi:
-            citation += f" — {doi}."
-        if url:
-            citation += f" — {url}"
+        if paper.doi:
+            citation += f" — DOI: {paper.doi}."
+        if paper.pdf_url:
+            citation += f" — URL: {paper.pdf_url}"
         
         return citation
     
     @staticmethod
-    def format_bibliography(papers: List[Dict]) -> str:
-        """Format full bibliography in GOST style"""
+    def _dedupe_key(entry_id: str) -> str:
+        """Key shared by all versions of a paper: its first-version id
         
-        bibliography = "## Список литературы\n\n"
+        Most ids already are first versions and need no new string.
+        """
+        if entry_id.endswith("v1"):
+            return entry_id
+        return CandidateNormalizer.base_id(entry_id) + "v1"
+    
+    @staticmethod
+    def _format_chunk(papers: List[Paper], number: int, seen: Optional[Set[str]]) -> Tuple[str, int]:
+        """Numbered entries for papers not yet in `seen` (all papers without it), and the next number"""
+        format_article = GOSTFormatter.format_article
+        dedupe_key = GOSTFormatter._dedupe_key
         
+        text = ""
+        for paper in papers:
+            paper_id = paper.id
+            if seen is not None:
+                key = paper_id if paper_id.endswith("v1") else dedupe_key(paper_id)
+                if key in seen:
+                    continue
+                seen.add(key)
+            text += f"{number}. {format_article(paper)}\n\n"
+            number += 1
+        return text, number
+    
+    @staticmethod
+    def stream_bibliography(
+        papers: Iterable[Paper],
+        chunk_size: int = 500,
+        start: int = 1,
+        seen: Optional[Set[str]] = None,
+        header: bool = True
+    ) -> Iterator[str]:
+        """Yield the bibliography in chunks of `chunk_size` papers for HTTP streaming
+        
+        Numbering starts at `start`. Pass a `seen` set to de-duplicate: papers
+        already in it (by any version) are skipped and the rest added, so the
+        same set can be shared across documents. Without it no dedupe keys
+        are computed.
+        """
+        if header:
+            yield BIBLIOGRAPHY_HEADER
+        
+        papers = iter(papers)
+        number = start
+        while True:
+            batch = list(islice(papers, chunk_size))
+            if not batch:
+                return
+            text, number = GOSTFormatter._format_chunk(batch, number, seen)
+            if text:
+                yield text
+    
+    @staticmethod
+    def format_bibliography(papers: List[Paper]) -> str:
+        """Format full bibliography in GOST style"""
+        bibliography = BIBLIOGRAPHY_HEADER
         for i, paper in enumerate(papers, 1):
             citation = GOSTFormatter.format_article(paper)
             bibliography += f"{i}. {citation}\n\n"
@@ -53,7 +102,7 @@ class GOSTFormatter:
         return bibliography
     
     @staticmethod
-    def format_full_document(papers: List[Dict]) -> str:
+    def format_full_document(papers: List[Paper]) -> str:
         """Format bibliography"""
         document = GOSTFormatter.format_bibliography(papers)
         
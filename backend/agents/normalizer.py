@@ -0,0 +1,141 @@
+import re
+import zlib
+from typing import List, Optional, Tuple
+
+import numpy as np
+from config import Config
+from models.paper import Paper
+
+_VERSION_RE = re.compile(r"v(\d+)$")
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+class CandidateNormalizer:
+    """Collapse arXiv versions and near-duplicate candidates before ranking"""
+
+    def __init__(
+        self,
+        num_perm: int = Config.DEDUP_NUM_PERM,
+        bands: int = Config.DEDUP_LSH_BANDS,
+        shingle_size: int = Config.DEDUP_SHINGLE_SIZE,
+        threshold: float = Config.DEDUP_THRESHOLD,
+        seed: int = 42
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+    @staticmethod
+    def split_version(entry_id: str) -> Tuple[str, int]:
+        """Split an arXiv entry id into base id and version number"""
+        match = _VERSION_RE.search(entry_id)
+        if match is None:
+            return entry_id, 0
+        return entry_id[:match.start()], int(match.group(1))
+
+    @staticmethod
+    def base_id(entry_id: str) -> str:
+        """ArXiv entry id without the version suffix"""
+        return CandidateNormalizer.split_version(entry_id)[0]
+
+    @staticmethod
+    def _is_newer(paper: Paper, other: Paper) -> bool:
+        base, version = CandidateNormalizer.split_version(paper.id)
+        other_base, other_version = CandidateNormalizer.split_version(other.id)
+        if base == other_base and version != other_version:
+            return version > other_version
+        if paper.updated and other.updated:
+            return paper.updated > other.updated
+        return False
+
+    def collapse_versions(self, papers: List[Paper]) -> List[Paper]:
+        """Keep only the latest version of every arXiv entry"""
+        latest = {}
+        for paper in papers:
+            key = self.base_id(paper.id)
+            if key not in latest or self._is_newer(paper, latest[key]):
+                latest[key] = paper
+        return list(latest.values())
+
+    def _shingles(self, paper: Paper) -> List[str]:
+        tokens = _TOKEN_RE.findall(f"{paper.title} {paper.summary}".lower())
+        if len(tokens) < self.shingle_size:
+            return [" ".join(tokens)] if tokens else []
+        return [
+            " ".join(tokens[i:i + self.shingle_size])
+            for i in range(len(tokens) - self.shingle_size + 1)
+        ]
+
+    def signature(self, paper: Paper) -> Optional[np.ndarray]:
+        """MinHash signature of the title and abstract word shingles"""
+        shingles = self._shingles(paper)
+        if not shingles:
+            return None
+
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in set(shingles)),
+            dtype=np.uint64
+        )
+        permuted = (np.outer(hashes, self._a) + self._b) % np.uint64(_MERSENNE_PRIME)
+        return permuted.min(axis=0)
+
+    def _candidate_pairs(self, signatures: List[Optional[np.ndarray]]):
+        """Index signatures in LSH bands and yield pairs that share a bucket"""
+        seen = set()
+        for band in range(self.bands):
+            buckets = {}
+            start = band * self.rows
+            for i, sig in enumerate(signatures):
+                if sig is None:
+                    continue
+                key = sig[start:start + self.rows].tobytes()
+                buckets.setdefault(key, []).append(i)
+
+            for members in buckets.values():
+                for pos, i in enumerate(members):
+                    for j in members[pos + 1:]:
+                        if (i, j) not in seen:
+                            seen.add((i, j))
+                            yield i, j
+
+    def collapse_near_duplicates(self, papers: List[Paper]) -> List[Paper]:
+        """Merge papers whose estimated Jaccard similarity exceeds the threshold"""
+        if len(papers) < 2:
+            return papers
+
+        signatures = [self.signature(paper) for paper in papers]
+        parent = list(range(len(papers)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j in self._candidate_pairs(signatures):
+            similarity = float(np.mean(signatures[i] == signatures[j]))
+            if similarity >= self.threshold:
+                parent[find(j)] = find(i)
+
+        # Keep the most recent paper of every group, in first-seen order
+        groups = {}
+        for i, paper in enumerate(papers):
+            root = find(i)
+            if root not in groups or self._is_newer(paper, groups[root]):
+                groups[root] = paper
+
+        return list(groups.values())
+
+    def normalize(self, papers: List[Paper]) -> List[Paper]:
+        """Collapse versions first, then near-duplicate titles and abstracts"""
+        return self.collapse_near_duplicates(self.collapse_versions(papers))
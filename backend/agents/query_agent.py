@@ -1,7 +1,9 @@
 from typing import List, Dict
 from langchain_core.prompts.prompt import PromptTemplate
+from models.llm_scheduler import PRIORITY_QUERY, scheduler
 from models.yandex_llm import YandexGPT
 from config import Config
+from run_context import DeadlineExceeded, RunContext
 
 class QueryAgent:
     """Agent for query transformation and enhancement"""
@@ -33,7 +35,16 @@ class QueryAgent:
             """
         )
     
-    def process_query(self, user_query: str) -> Dict:
+    @staticmethod
+    def raw_query(user_query: str) -> Dict:
+        """Search plan that uses the user query as is"""
+        return {
+            "enhanced_queries": [user_query],
+            "arxiv_queries": [user_query],
+            "keywords": user_query.split()
+        }
+    
+    async def process_query(self, user_query: str, ctx: RunContext = None) -> Dict:
         """Process and enhance user query"""
         language = "русский" if any(ord(c) > 127 for c in user_query) else "английский"
         
@@ -42,7 +53,14 @@ class QueryAgent:
             language=language
         )
         
-        response = self.llm(prompt)
+        ctx = ctx or RunContext()
+        try:
+            response = await ctx.within_deadline(
+                scheduler.submit(self.llm, prompt, PRIORITY_QUERY, ctx)
+            )
+        except DeadlineExceeded:
+            # Out of time: fall back to the raw query below
+            response = ""
         
         try:
             import json
@@ -50,10 +68,6 @@ class QueryAgent:
         except Exception as e:
             print('process query died', str(e), flush=True)
             # Fallback if JSON parsing fails
-            result = {
-                "enhanced_queries": [user_query],
-                "arxiv_queries": [user_query],
-                "keywords": user_query.split()
-            }
+            result = self.raw_query(user_query)
         
         return result
@@ -2,29 +2,34 @@ import numpy as np
 from rank_bm25 import BM25Okapi
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
-from typing import List, Dict
+from typing import List
+from cache import make_cache, make_key
+from models.llm_scheduler import PRIORITY_RANKING, scheduler
+from models.paper import Paper
 from models.yandex_llm import YandexGPT
 from config import Config
+from run_context import RunContext
 
 class RankingAgent:
     """Agent for ranking search results"""
     
     def __init__(self):
         self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_cache = make_cache("embeddings", Config.EMBEDDING_CACHE_SIZE)
         self.llm = YandexGPT(
             api_key=Config.YANDEX_API_KEY,
             folder_id=Config.YANDEX_FOLDER_ID,
             model_uri=Config.YANDEX_GPT_MODEL_URI
         )
     
-    def rank_bm25(self, papers: List[Dict], query: str, top_k: int = 50) -> List[Dict]:
+    def rank_bm25(self, papers: List[Paper], query: str, top_k: int = 50) -> List[Paper]:
         """Rank papers using BM25"""
         if not papers:
             return []
         
         # Prepare documents for BM25
         documents = [
-            f"{p['title']} {p['summary']}"
+            f"{p.title} {p.summary}"
             for p in papers
         ]
         
@@ -39,19 +44,19 @@ class RankingAgent:
         
         return [papers[i] for i in ranked_indices]
     
-    def rank_embeddings(self, papers: List[Dict], query: str, top_k: int = 25) -> List[Dict]:
+    def rank_embeddings(self, papers: List[Paper], query: str, top_k: int = 25) -> List[Paper]:
         """Rank papers using embeddings"""
         if not papers:
             return []
         
         # Create embeddings
         documents = [
-            f"{p['title']} {p['summary'][:500]}"
+            f"{p.title} {p.summary[:500]}"
             for p in papers
         ]
         
-        doc_embeddings = self.embedding_model.encode(documents)
-        query_embedding = self.embedding_model.encode([query])
+        doc_embeddings = self.encode(documents)
+        query_embedding = self.encode([query])
         
         # Calculate similarity
         similarities = cosine_similarity(query_embedding, doc_embeddings)[0]
@@ -61,11 +66,39 @@ class RankingAgent:
         
         return [papers[i] for i in ranked_indices]
     
-    async def rank_with_llm(self, papers: List[Dict], query: str, top_k: int = 10) -> List[Dict]:
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts, reusing cached embeddings"""
+        keys = [make_key(text) for text in texts]
+        embeddings = [self.embedding_cache.get(key) for key in keys]
+        
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            encoded = self.embedding_model.encode([texts[i] for i in missing])
+            for i, embedding in zip(missing, encoded):
+                self.embedding_cache.set(keys[i], embedding)
+                embeddings[i] = embedding
+        
+        return np.vstack(embeddings)
+    
+    async def rank_with_llm(self, papers: List[Paper], query: str, top_k: int = 10,
+                            ctx: RunContext = None) -> List[Paper]:
         """Rank papers using LLM for relevance assessment"""
         if not papers or len(papers) <= top_k:
             return papers
         
+        scored_papers = await self.score_with_llm(papers, query, ctx)
+        
+        # Sort by relevance score; papers left unscored at the deadline keep
+        # their embedding order after the scored ones
+        scored_papers.sort(
+            key=lambda x: (x.relevance_score is not None, x.relevance_score or 0.0),
+            reverse=True
+        )
+        
+        return scored_papers[:top_k]
+    
+    async def score_with_llm(self, papers: List[Paper], query: str, ctx: RunContext = None) -> List[Paper]:
+        """Set an LLM relevance score on each paper in place"""
         relevance_prompt = """
         Оцени релевантность статьи запросу от 0 до 10.
         
@@ -77,38 +110,50 @@ class RankingAgent:
         Ответь только числом от 0 до 10.
         """
         
-        scored_papers = []
-        for paper in papers[:25]:  # Limit to avoid too many API calls
+        ctx = ctx or RunContext()
+        
+        async def score(paper: Paper) -> Paper:
             prompt = relevance_prompt.format(
                 query=query,
-                title=paper['title'],
-                summary=paper['summary'][:500]
+                title=paper.title,
+                summary=paper.summary[:500]
             )
             
             try:
-                score_text = self.llm(prompt)
-                score = float(score_text.strip())
-            except:
-                score = 5.0  # Default score if parsing fails
-            
-            paper_with_score = paper.copy()
-            paper_with_score['relevance_score'] = score
-            scored_papers.append(paper_with_score)
+                score_text = await scheduler.submit(self.llm, prompt, PRIORITY_RANKING, ctx)
+                paper.relevance_score = float(score_text.strip())
+            except Exception:
+                paper.relevance_score = 5.0  # Default score if parsing fails
+            return paper
+        
+        # Limit to avoid too many API calls; the scheduler paces the rest
+        candidates = papers[:25]
+        await ctx.gather_partial(*(score(paper) for paper in candidates))
+        return candidates
+    
+    async def multi_stage_ranking(self, papers: List[Paper], query: str, ctx: RunContext = None,
+                                  llm_candidates: int = Config.TOP_K_EMBEDDING) -> List[Paper]:
+        """Perform multi-stage ranking
         
-        # Sort by relevance score
-        scored_papers.sort(key=lambda x: x['relevance_score'], reverse=True)
+        `llm_candidates` embedding-ranked papers go to the LLM stage; 0 skips it.
+        """
+        ctx = ctx or RunContext()
         
-        return scored_papers[:top_k]
-    
-    async def multi_stage_ranking(self, papers: List[Dict], query: str) -> List[Dict]:
-        """Perform multi-stage ranking"""
         # Stage 1: BM25
-        ranked_bm25 = self.rank_bm25(papers, query, Config.TOP_K_BM25)
+        with ctx.span("bm25"):
+            ranked_bm25 = self.rank_bm25(papers, query, Config.TOP_K_BM25)
         
         # Stage 2: Embeddings
-        ranked_embeddings = self.rank_embeddings(ranked_bm25, query, Config.TOP_K_EMBEDDING)
+        with ctx.span("embeddings"):
+            ranked_embeddings = self.rank_embeddings(ranked_bm25, query, Config.TOP_K_EMBEDDING)
+        
+        if not llm_candidates:
+            return ranked_embeddings[:Config.TOP_K_FINAL]
         
         # Stage 3: LLM
-        final_ranking = await self.rank_with_llm(ranked_embeddings, query, Config.TOP_K_FINAL)
+        with ctx.span("llm scoring"):
+            final_ranking = await self.rank_with_llm(
+                ranked_embeddings[:llm_candidates], query, Config.TOP_K_FINAL, ctx
+            )
         
         return final_ranking
@@ -1,7 +1,16 @@
 import arxiv
-from typing import List, Dict
+from typing import List
 import asyncio
+import dataclasses
+import time
 from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from agents.normalizer import CandidateNormalizer
+from cache import make_cache, make_key
+from config import Config
+from models.paper import Paper
+from run_context import RunContext
 
 class SearchAgent:
     """Agent for searching papers on ArXiv"""
@@ -9,12 +18,37 @@ class SearchAgent:
     def __init__(self, max_results: int = 100):
         self.max_results = max_results
         self.executor = ThreadPoolExecutor(max_workers=5)
+        self.normalizer = CandidateNormalizer()
+        self.cache = make_cache("arxiv_results", Config.SEARCH_CACHE_SIZE)
+    
+    @staticmethod
+    def restrict_submitted(query: str, since: datetime) -> str:
+        """Restrict an arXiv query to papers submitted after `since`"""
+        until = datetime.now(timezone.utc)
+        return (
+            f"({query}) AND submittedDate:"
+            f"[{since:%Y%m%d%H%M} TO {until:%Y%m%d%H%M}]"
+        )
     
-    def search_arxiv(self, query: str, max_results: int = None) -> List[Dict]:
+    def search_arxiv(self, query: str, max_results: int = None, since: datetime = None) -> List[Paper]:
         """Search ArXiv for papers"""
         if max_results is None:
             max_results = self.max_results
+        if since is not None:
+            query = self.restrict_submitted(query, since)
         
+        # Entries carry their fetch time, so every cache tier expires them alike
+        key = make_key(query, max_results)
+        cached = self.cache.get(key)
+        if cached is None or time.time() - cached[0] > Config.SEARCH_CACHE_TTL:
+            cached = (time.time(), self._fetch(query, max_results))
+            self.cache.set(key, cached)
+        
+        # Hand out copies so later stages can fill papers in place
+        return [dataclasses.replace(paper) for paper in cached[1]]
+    
+    @staticmethod
+    def _fetch(query: str, max_results: int) -> List[Paper]:
         search = arxiv.Search(
             query=query,
             max_results=max_results,
@@ -22,39 +56,23 @@ class SearchAgent:
             sort_order=arxiv.SortOrder.Descending
         )
         
-        papers = []
-        for paper in search.results():
-            papers.append({
-                "id": paper.entry_id,
-                "title": paper.title,
-                "authors": [author.name for author in paper.authors],
-                "summary": paper.summary,
-                "published": paper.published,
-                "updated": paper.updated,
-                "categories": paper.categories,
-                "pdf_url": paper.pdf_url,
-                "doi": paper.doi,
-                "journal_ref": paper.journal_ref
-            })
-        
-        return papers
+        return [Paper.from_arxiv(result) for result in search.results()]
     
-    async def search_multiple_queries(self, queries: List[str]) -> List[Dict]:
+    async def search_multiple_queries(self, queries: List[str], since: datetime = None,
+                                      ctx: RunContext = None) -> List[Paper]:
         """Search multiple queries in parallel"""
         loop = asyncio.get_event_loop()
+        ctx = ctx or RunContext()
         
-        tasks = [
-            loop.run_in_executor(self.executor, self.search_arxiv, query, 30)
-            for query in queries
-        ]
+        async def search(query: str) -> List[Paper]:
+            with ctx.span(f"arxiv: {query}"):
+                return await loop.run_in_executor(self.executor, self.search_arxiv, query, 30, since)
         
-        results = await asyncio.gather(*tasks)
+        # Queries still running at the deadline are dropped
+        results = await ctx.gather_partial(*(search(query) for query in queries))
         
-        # Merge and deduplicate results
-        all_papers = {}
-        for papers in results:
-            for paper in papers:
-                if paper["id"] not in all_papers:
-                    all_papers[paper["id"]] = paper
+        # Merge results and collapse versions and near-duplicates
+        all_papers = [paper for papers in results if papers for paper in papers]
         
-        return list(all_papers.values())
+        with ctx.span("normalize"):
+            return self.normalizer.normalize(all_papers)
@@ -1,15 +1,17 @@
 import asyncio
 import logging
 import traceback
-import uuid
-from typing import Dict, List
+from typing import Callable, List
 
-import aiofiles
 import aiohttp
 import fitz  # PyMuPDF
-from aiopath import AsyncPath
+from cache import make_cache
 from config import Config
+from models.llm_scheduler import PRIORITY_SUMMARY, scheduler
+from models.paper import Paper
 from models.yandex_llm import YandexGPT
+from pdf_downloader import PDFDownloadError, downloader
+from run_context import RunCancelled, RunContext
 
 logger = logging.getLogger("SummaryAgent")
 logger.setLevel(logging.DEBUG)
@@ -18,6 +20,9 @@ logger.setLevel(logging.DEBUG)
 class SummaryAgent:
     """Agent for summarizing papers"""
     
+    # Extracted PDF text, shared by all runs in the process
+    text_cache = make_cache("pdf_text", Config.PDF_CACHE_SIZE)
+    
     def __init__(self):
         self.llm = YandexGPT(
             api_key=Config.YANDEX_API_KEY,
@@ -43,7 +48,20 @@ class SummaryAgent:
         """
 
     @staticmethod
-    async def extract_full_text(paper_url: str) -> str:
+    async def extract_full_text(paper_url: str, ctx: RunContext = None) -> str:
+        cached = SummaryAgent.text_cache.get(paper_url)
+        if cached is not None:
+            return cached
+        
+        text = await SummaryAgent._download_and_extract(paper_url, ctx)
+        if text is not None:
+            SummaryAgent.text_cache.set(paper_url, text)
+        if ctx is not None:
+            ctx.record("pdf_downloads")
+        return text
+    
+    @staticmethod
+    async def _download_and_extract(paper_url: str, ctx: RunContext = None) -> str:
         try:
             # Convert abstract URL to PDF URL
             if '/abs/' in paper_url:
@@ -51,28 +69,22 @@ class SummaryAgent:
             else:
                 pdf_url = paper_url
             
-            # Download PDF to temporary file
-            async with aiohttp.ClientSession() as session:
-                async with session.get(pdf_url) as resp:
-                    resp.raise_for_status()
-                    content = await resp.read()
+            ctx = ctx or RunContext()
             
-            # Create a temporary file and write the downloaded content
-            temp_file_path = AsyncPath('.').joinpath(f'{uuid.uuid4()}.pdf')
-            async with aiofiles.open(temp_file_path, mode="wb") as f:
-                await f.write(content)
+            # Download PDF into memory through the shared, size-capped downloader
+            with ctx.span("pdf download"):
+                content = await downloader.fetch(pdf_url)
             
-            try:
-                # Run synchronous extraction in an executor thread
-                loop = asyncio.get_running_loop()
-                doc = await loop.run_in_executor(None, fitz.open, temp_file_path)
-                structured_text = await loop.run_in_executor(None, SummaryAgent._extract_structured_text, doc)
-                doc.close()
-            
-            finally:
-                # Remove temporary file
-                await temp_file_path.unlink(missing_ok=True)
-
+            # Run synchronous extraction in an executor thread
+            loop = asyncio.get_running_loop()
+            with ctx.span("pdf parse"):
+                doc = await loop.run_in_executor(None, SummaryAgent._open_pdf, content)
+                try:
+                    structured_text = await loop.run_in_executor(
+                        None, SummaryAgent._extract_structured_text, doc, ctx
+                    )
+                finally:
+                    doc.close()
 
             if structured_text.strip():
                 return structured_text
@@ -80,6 +92,12 @@ class SummaryAgent:
                 logger.error("Could not extract text from PDF")
                 return None
                     
+        except RunCancelled:
+            logger.info(f"Text extraction for {paper_url} aborted")
+            return None
+        except PDFDownloadError as e:
+            logger.error(f"Skipping PDF: {e}")
+            return None
         except aiohttp.ClientResponseError as e:
             logger.error(f"Error loading PDF: {e}")
             logger.error(traceback.format_exc())
@@ -90,11 +108,18 @@ class SummaryAgent:
             return None
     
     @staticmethod
-    def _extract_structured_text(doc) -> str:
+    def _open_pdf(content: bytes):
+        return fitz.open(stream=content, filetype="pdf")
+    
+    @staticmethod
+    def _extract_structured_text(doc, ctx: RunContext = None) -> str:
         """Extract and clean text using PyMuPDF's structure analysis with NLTK sentence tokenization."""
         all_text = ""
         # First, extract all text from all pages
         for page_num in range(len(doc)):
+            # Runs in an executor thread, so it cannot be cancelled from the loop
+            if ctx is not None and ctx.stopped:
+                raise RunCancelled("Text extraction aborted")
             page = doc[page_num]
             page_text = page.get_text()
             all_text += page_text + "\n"
@@ -102,27 +127,47 @@ class SummaryAgent:
         return all_text
     
 
-    async def summarize_paper(self, paper: Dict) -> Dict:
-        """Summarize a single paper"""
+    async def summarize_paper(self, paper: Paper, ctx: RunContext = None,
+                              full_text: bool = True, use_llm: bool = True) -> Paper:
+        """Summarize a single paper
+        
+        Without `full_text` the abstract is summarized instead of the PDF;
+        without `use_llm` the abstract itself is used as the summary.
+        """
+        if not use_llm:
+            paper.ru_summary = paper.summary
+            return paper
         
-        full_text = await SummaryAgent.extract_full_text(paper['id'])
+        ctx = ctx or RunContext()
+        text = await SummaryAgent.extract_full_text(paper.id, ctx) if full_text else None
 
         prompt = self.summary_prompt.format(
-            title=paper['title'],
-            authors=', '.join(paper['authors'][:3]),
-            text=full_text
+            title=paper.title,
+            authors=', '.join(paper.authors[:3]),
+            text=text or paper.summary
         )
         
-        summary = self.llm(prompt)
+        paper.ru_summary = await scheduler.submit(self.llm, prompt, PRIORITY_SUMMARY, ctx)
         
-        return {
-            **paper,
-            'ru_summary': summary
-        }
+        return paper
     
-    async def summarize_papers(self, papers: List[Dict]) -> List[Dict]:
-        """Summarize multiple papers"""
-        tasks = [self.summarize_paper(paper) for paper in papers]
-        summarized = await asyncio.gather(*tasks)
-        return summarized
+    async def summarize_papers(self, papers: List[Paper], ctx: RunContext = None,
+                               full_text: bool = True, use_llm: bool = True,
+                               on_summarized: Callable[[Paper], None] = None) -> List[Paper]:
+        """Summarize multiple papers
+        
+        Papers not summarized by the deadline are returned without `ru_summary`.
+        `on_summarized` is called with each paper as soon as its summary is ready.
+        """
+        ctx = ctx or RunContext()
+        
+        async def summarize(paper: Paper) -> Paper:
+            with ctx.span(f"summarize {paper.id.rsplit('/', 1)[-1]}"):
+                paper = await self.summarize_paper(paper, ctx, full_text, use_llm)
+            if on_summarized is not None:
+                on_summarized(paper)
+            return paper
+        
+        await ctx.gather_partial(*(summarize(paper) for paper in papers))
+        return papers
 
@@ -0,0 +1,204 @@
+"""Offline batch mode: run a JSON-lines file of research queries.
+
+Each input line is ``{"id": "...", "query": "...", "mode": "..."}`` (``id``
+and ``mode`` are optional).
+For every query a GOST document ``<id>.md`` is written to the output
+directory and a line is appended to ``report.jsonl``. Queries already
+reported as successful are skipped, so an interrupted batch resumes where
+it stopped; queries that were in progress resume from their last workflow
+checkpoint. All queries share one ``ResearchWorkflow``, and therefore its
+arXiv, embedding, PDF and LLM response caches.
+
+With ``--profile`` every query is profiled into ``PROFILE_DIR``.
+
+Usage:
+    python batch.py queries.jsonl --output-dir reports --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+import time
+import traceback
+from pathlib import Path
+from typing import Dict, List
+
+from agents.summary_agent import SummaryAgent
+from cache import make_key
+from checkpoint import CheckpointStore
+from execution_plan import PLANS
+from models.llm_scheduler import scheduler
+from models.yandex_llm import response_cache
+from pdf_downloader import downloader
+from profiling import RunProfiler, should_profile
+from run_context import RunContext
+from workflow import ResearchWorkflow
+
+logger = logging.getLogger("Batch")
+
+REPORT_FILE = "report.jsonl"
+SUMMARY_FILE = "run_report.json"
+
+
+def load_queries(path: Path) -> List[Dict]:
+    """Read queries from a JSON-lines file, assigning ids where missing
+
+    Ids name the report files and key resumption, so two queries whose ids
+    are equal once made file-safe raise ValueError.
+    """
+    queries = []
+    id_lines = {}
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            query_id = re.sub(r"[^\w.-]", "_", str(item.get("id") or f"query-{line_no}"))
+            if query_id in id_lines:
+                raise ValueError(
+                    f"Line {line_no}: query id {query_id!r} is already used on line {id_lines[query_id]}"
+                )
+            id_lines[query_id] = line_no
+            queries.append({
+                "id": query_id,
+                "query": item["query"],
+                "mode": item.get("mode")
+            })
+    return queries
+
+
+def load_completed(report_path: Path) -> set:
+    """Ids of queries that already finished successfully"""
+    if not report_path.exists():
+        return set()
+
+    completed = set()
+    with open(report_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A partially written last line from an interrupted run
+                continue
+            if record.get("status") == "ok":
+                completed.add(record["id"])
+    return completed
+
+
+class BatchRunner:
+    """Run queries through a shared workflow with bounded concurrency"""
+
+    def __init__(self, workflow: ResearchWorkflow, output_dir: Path, concurrency: int = 2,
+                 mode: str = None, profile: bool = False):
+        self.workflow = workflow
+        self.mode = mode
+        self.profile = profile
+        self.output_dir = output_dir
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.report_path = output_dir / REPORT_FILE
+        self._report_lock = asyncio.Lock()
+
+    async def _write_report(self, record: Dict):
+        async with self._report_lock:
+            with open(self.report_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    async def run_one(self, item: Dict) -> Dict:
+        async with self.semaphore:
+            started = time.perf_counter()
+            record = {"id": item["id"], "query": item["query"]}
+            try:
+                mode = item.get("mode") or self.mode
+                # Stable per output directory, so a rerun of the batch resumes the query
+                ctx = RunContext(
+                    user=f"batch:{item['id']}",
+                    run_id=make_key(str(self.output_dir.resolve()), item["id"], item["query"], mode)
+                )
+                if should_profile(self.profile):
+                    ctx.profiler = RunProfiler(ctx.run_id).start()
+                try:
+                    state = await self.workflow.run(item["query"], ctx, mode)
+                finally:
+                    if ctx.profiler is not None:
+                        record["profile"] = (await ctx.profiler.finish())["path"]
+                document_path = self.output_dir / f"{item['id']}.md"
+                document_path.write_text(state["final_document"], encoding="utf-8")
+                record.update(
+                    status="ok",
+                    papers=len(state.get("summarized_papers", [])),
+                    document=document_path.name,
+                    cost=state.get("cost")
+                )
+            except Exception as e:
+                logger.error(f"Query {item['id']} failed: {e}")
+                logger.error(traceback.format_exc())
+                record.update(status="error", error=str(e))
+
+            record["seconds"] = round(time.perf_counter() - started, 3)
+            await self._write_report(record)
+            logger.info(f"{item['id']}: {record['status']} in {record['seconds']}s")
+            return record
+
+    async def run(self, queries: List[Dict]) -> Dict:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        completed = load_completed(self.report_path)
+        pending = [item for item in queries if item["id"] not in completed]
+
+        started = time.perf_counter()
+        try:
+            records = await asyncio.gather(*(self.run_one(item) for item in pending))
+        finally:
+            await downloader.close()
+        elapsed = time.perf_counter() - started
+
+        succeeded = sum(1 for record in records if record["status"] == "ok")
+        summary = {
+            "queries": len(queries),
+            "skipped": len(queries) - len(pending),
+            "succeeded": succeeded,
+            "failed": len(records) - succeeded,
+            "elapsed_seconds": round(elapsed, 3),
+            "queries_per_minute": round(60 * len(records) / elapsed, 3) if elapsed else 0.0,
+            "llm_scheduler": scheduler.stats(),
+            "caches": {
+                "arxiv": self.workflow.search_agent.cache.stats(),
+                "embeddings": self.workflow.ranking_agent.embedding_cache.stats(),
+                "pdf_text": SummaryAgent.text_cache.stats(),
+                "llm": response_cache.stats()
+            }
+        }
+        (self.output_dir / SUMMARY_FILE).write_text(
+            json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a file of research queries")
+    parser.add_argument("queries", type=Path, help="JSON-lines file with one query per line")
+    parser.add_argument("--output-dir", type=Path, default=Path("reports"))
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--mode", choices=sorted(PLANS), default=None,
+                        help="execution tier for queries without their own mode")
+    parser.add_argument("--profile", action="store_true",
+                        help="write a speedscope profile for every query")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    try:
+        queries = load_queries(args.queries)
+    except ValueError as e:
+        parser.error(f"{args.queries}: {e}")
+
+    runner = BatchRunner(
+        ResearchWorkflow(CheckpointStore()), args.output_dir, args.concurrency, args.mode, args.profile
+    )
+    summary = asyncio.run(runner.run(queries))
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
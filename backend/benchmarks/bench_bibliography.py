@@ -0,0 +1,114 @@
+"""Benchmark bulk GOST bibliography export.
+
+Compares the previous `+=` implementation (with the previous
+`format_article`) against the interactive document path and the streaming
+export. The de-duplicating export (used when several sources may overlap)
+is timed separately. Cases are interleaved and each
+timing is the best of `--repeat` runs.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_bibliography --entries 20000
+"""
+import argparse
+import gc
+import time
+from datetime import datetime
+
+from agents.gost_formatter import GOSTFormatter
+from models.paper import Paper
+
+
+def make_papers(count: int):
+    return [
+        Paper(
+            id=f"http://arxiv.org/abs/{2000 + i // 100000}.{i % 100000:05d}v1",
+            title=f"Synthetic paper number {i} on scalable bibliography export",
+            authors=[f"Author {i}", f"Coauthor {i}", f"Third {i}", f"Fourth {i}"],
+            summary="",
+            published=datetime(2020 + i % 5, 1, 1),
+            pdf_url=f"http://arxiv.org/pdf/{i}v1",
+            doi=f"10.0000/{i}" if i % 3 == 0 else None
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_format_article(paper: Paper) -> str:
+    """GOSTFormatter.format_article as it was before the streaming export"""
+    authors = paper.authors[:3]
+    if len(authors) > 3:
+        authors_str = f"{authors[0]} и др."
+    else:
+        authors_str = ", ".join(authors)
+    title = paper.title.replace('\n', ' ')
+    year = paper.published.year if paper.published else datetime.now().year
+    url = f"URL: {paper.pdf_url}" if paper.pdf_url else ""
+    journal = paper.journal_ref or 'ArXiv preprint'
+    doi = f"DOI: {paper.doi}" if paper.doi else ""
+    citation = f"{authors_str} {title} // {journal}. — {year}."
+    if doi:
+        citation += f" — {doi}."
+    if url:
+        citation += f" — {url}"
+    return citation
+
+
+def concat_baseline(papers) -> str:
+    bibliography = "## Список литературы\n\n"
+    for i, paper in enumerate(papers, 1):
+        citation = legacy_format_article(paper)
+        bibliography += f"{i}. {citation}\n\n"
+    return bibliography
+
+
+def stream_export(papers) -> int:
+    return sum(len(chunk) for chunk in GOSTFormatter.stream_bibliography(papers))
+
+
+def stream_export_dedupe(papers) -> int:
+    return sum(len(chunk) for chunk in GOSTFormatter.stream_bibliography(papers, seen=set()))
+
+
+def first_chunk(papers) -> str:
+    chunks = GOSTFormatter.stream_bibliography(papers)
+    return next(chunks) + next(chunks)
+
+
+def full_document(papers) -> str:
+    return GOSTFormatter.format_full_document(papers)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    papers = make_papers(args.entries)
+    cases = [
+        # label, function, report entries/s
+        ("baseline (+=)", concat_baseline, True),
+        ("document", full_document, True),
+        ("streaming, first chunk", first_chunk, False),
+        ("streaming", stream_export, True),
+        ("streaming + dedupe", stream_export_dedupe, True),
+    ]
+    # Interleave the cases so machine noise hits all of them alike
+    best = {label: float("inf") for label, *_ in cases}
+    for _ in range(args.repeat):
+        for label, func, _ in cases:
+            gc.collect()
+            started = time.perf_counter()
+            func(papers)
+            best[label] = min(best[label], time.perf_counter() - started)
+
+    print(f"{args.entries} entries, best of {args.repeat}")
+    for label, _, rate in cases:
+        line = f"{label:<28} {best[label] * 1000:9.1f} ms"
+        if rate:
+            line += f"  {len(papers) / best[label]:12.0f} entries/s"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
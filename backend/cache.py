@@ -0,0 +1,168 @@
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Union
+
+from config import Config
+
+logger = logging.getLogger("Cache")
+
+
+def make_key(*parts: Any) -> str:
+    """Stable cache key for an arbitrary tuple of values"""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache shared by the agents"""
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class SharedCache:
+    """SQLite-backed cache shared by all worker processes on the host
+
+    Values are pickled. Connections are opened lazily per process and
+    thread, so the store can be created before the server forks.
+    """
+
+    def __init__(self, path: str, namespace: str, max_size: int = 1024):
+        self.path = path
+        self.namespace = namespace
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT, key TEXT, value BLOB, created REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._local.connection = connection
+            self._local.pid = pid
+        return self._local.connection
+
+    def get(self, key: str, default: Optional[Any] = None) -> Any:
+        try:
+            row = self._connection().execute(
+                "SELECT value FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        try:
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                (self.namespace, key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), time.time())
+            )
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self._prune(connection)
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache write failed: {e}")
+
+    def _prune(self, connection: sqlite3.Connection):
+        connection.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key NOT IN ("
+            "SELECT key FROM cache WHERE namespace = ? ORDER BY created DESC LIMIT ?)",
+            (self.namespace, self.namespace, self.max_size)
+        )
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class TieredCache:
+    """Per-process LRU in front of the host-wide shared cache"""
+
+    def __init__(self, local: LRUCache, shared: SharedCache):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key: str, default: Optional[Any] = None) -> Any:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        value = self.shared.get(key)
+        if value is None:
+            return default
+        self.local.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.local.set(key, value)
+        self.shared.set(key, value)
+
+    def __len__(self) -> int:
+        return len(self.local)
+
+    def stats(self) -> dict:
+        return {**self.local.stats(), "shared": self.shared.stats()}
+
+
+def make_cache(namespace: str, max_size: int) -> Union[LRUCache, TieredCache]:
+    """Process-local cache, backed by the shared store when SHARED_CACHE_PATH is set"""
+    local = LRUCache(max_size)
+    if not Config.SHARED_CACHE_PATH:
+        return local
+    return TieredCache(local, SharedCache(Config.SHARED_CACHE_PATH, namespace, max_size))
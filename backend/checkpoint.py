@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from config import Config
+from models.paper import Paper
+from serialization import encode_frame
+
+logger = logging.getLogger("Checkpoint")
+
+# State keys holding lists of papers
+PAPER_KEYS = ("raw_papers", "ranked_papers", "summarized_papers")
+
+
+class CheckpointStore:
+    """SQLite store of workflow state keyed by run id
+
+    Every completed stage output and every finished paper summary is
+    saved as its own row, so a failed or interrupted run can resume from
+    the last completed step.
+    """
+
+    def __init__(self, path: str = Config.CHECKPOINT_PATH, ttl_hours: float = Config.CHECKPOINT_TTL_HOURS):
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self._local = threading.local()
+        self._prune()
+
+    def _connection(self) -> sqlite3.Connection:
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "run_id TEXT, key TEXT, value TEXT, updated REAL, "
+                "PRIMARY KEY (run_id, key))"
+            )
+            self._local.connection = connection
+            self._local.pid = pid
+        return self._local.connection
+
+    def _write(self, run_id: str, key: str, value) -> None:
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)",
+                (run_id, key, encode_frame(value), time.time())
+            )
+        except sqlite3.Error as e:
+            # Checkpoints are an optimization; never fail the run because of them
+            logger.warning(f"Could not checkpoint {key} of run {run_id}: {e}")
+
+    def save_stage(self, run_id: str, key: str, value) -> None:
+        """Save the output of a completed stage"""
+        self._write(run_id, key, value)
+
+    def save_summary(self, run_id: str, paper: Paper) -> None:
+        """Save one finished paper summary"""
+        self._write(run_id, f"summary:{paper.id}", paper.ru_summary)
+
+    def load(self, run_id: str) -> Optional[Dict]:
+        """Saved state of a run, with per-paper summaries under 'summaries'"""
+        try:
+            rows = self._connection().execute(
+                "SELECT key, value FROM checkpoints WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not load checkpoint of run {run_id}: {e}")
+            return None
+        if not rows:
+            return None
+
+        state = {"summaries": {}}
+        for key, value in rows:
+            value = json.loads(value)
+            if key.startswith("summary:"):
+                state["summaries"][key[len("summary:"):]] = value
+            elif key in PAPER_KEYS:
+                state[key] = [Paper.from_dict(data) for data in value]
+            else:
+                state[key] = value
+        return state
+
+    def _prune(self):
+        try:
+            self._connection().execute(
+                "DELETE FROM checkpoints WHERE run_id IN ("
+                "SELECT run_id FROM checkpoints GROUP BY run_id HAVING MAX(updated) < ?)",
+                (time.time() - self.ttl,)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not prune checkpoints: {e}")
@@ -10,12 +10,64 @@ class Config:
     YANDEX_GPT_MODEL = "yandexgpt-lite"
     YANDEX_GPT_MODEL_URI = f"gpt://{YANDEX_FOLDER_ID}/{YANDEX_GPT_MODEL}"
     
+    # YandexGPT quotas, enforced by the central LLM scheduler
+    LLM_REQUESTS_PER_SECOND = float(os.getenv("LLM_REQUESTS_PER_SECOND", 10))
+    LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", 200000))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 10))
+    LLM_CHARS_PER_TOKEN = 3
+    LLM_REQUEST_TIMEOUT = 60
+    
     # ArXiv settings
     ARXIV_MAX_RESULTS = 100
     TOP_K_BM25 = 50
     TOP_K_EMBEDDING = 25
     TOP_K_FINAL = 10
     
+    # Cost model for expected-cost estimates of execution plans
+    COST_ARXIV_SECONDS = 4.0
+    COST_LOCAL_RANKING_SECONDS = 1.0
+    COST_LLM_CALL_SECONDS = 2.0
+    COST_LLM_SUMMARY_SECONDS = 6.0
+    COST_PDF_SECONDS = 5.0
+    
+    # Candidate deduplication settings
+    DEDUP_NUM_PERM = 64
+    DEDUP_LSH_BANDS = 16
+    DEDUP_SHINGLE_SIZE = 3
+    DEDUP_THRESHOLD = 0.8
+    
+    # In-process cache sizes, shared across runs
+    SEARCH_CACHE_SIZE = 256
+    SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 900))  # seconds; arXiv gets new papers daily
+    EMBEDDING_CACHE_SIZE = 20000
+    PDF_CACHE_SIZE = 200
+    LLM_CACHE_SIZE = 5000
+    EXPORT_SPOOL_BYTES = 8 * 1024 * 1024  # posted export bodies beyond this are spooled to disk
+    
+    # Host-wide cache shared by server workers (e.g. /dev/shm/gostomysl-cache.sqlite)
+    SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH")
+    
+    # PDF download settings
+    PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", 30 * 1024 * 1024))
+    PDF_MAX_CONNECTIONS = 20
+    PDF_CONNECTIONS_PER_HOST = 4
+    PDF_CONNECT_TIMEOUT = 10
+    PDF_DOWNLOAD_TIMEOUT = 60
+    
+    # Saved query ("watch") settings
+    WATCH_DIR = os.getenv("WATCH_DIR", "watches")
+    WATCH_OVERLAP_DAYS = 2  # re-search a margin before the last run for late announcements
+    
+    # Run checkpoints, used to resume a failed or interrupted run by its id
+    CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "checkpoints.sqlite")
+    CHECKPOINT_TTL_HOURS = 24
+    
+    # Opt-in per-run profiling, written as speedscope files named after the run id
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))  # share of runs profiled unasked
+    PROFILE_INTERVAL = 0.01
+    PROFILE_LAG_THRESHOLD = 0.05
+    
     # Redis settings (for caching)
     # REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
     # REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
@@ -23,3 +75,8 @@ class Config:
     # API settings
     API_HOST = "0.0.0.0"
     API_PORT = 8000
+    SERVER_WORKERS = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    RUN_DEADLINE_SECONDS = float(os.getenv("RUN_DEADLINE_SECONDS", 600))
+    
+    # Websocket settings
+    WS_PER_MESSAGE_DEFLATE = os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true"
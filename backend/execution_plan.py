@@ -0,0 +1,61 @@
+from dataclasses import asdict, dataclass
+from typing import Dict
+
+from config import Config
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """Latency/quality tier of a research run"""
+
+    mode: str
+    expand_query: bool        # LLM query expansion, otherwise the raw query is searched
+    llm_rank_candidates: int  # papers scored by the LLM; 0 keeps BM25 + embedding order
+    full_text: bool           # download PDFs, otherwise summarize from abstracts
+    llm_summaries: bool       # LLM summaries, otherwise the abstract itself is used
+
+    def expected_cost(self) -> Dict:
+        """Rough upfront estimate of LLM calls, PDF downloads and wall time"""
+        summaries = Config.TOP_K_FINAL if self.llm_summaries else 0
+        llm_calls = int(self.expand_query) + self.llm_rank_candidates + summaries
+
+        seconds = Config.COST_ARXIV_SECONDS + Config.COST_LOCAL_RANKING_SECONDS
+        if self.expand_query:
+            seconds += Config.COST_LLM_CALL_SECONDS
+        if self.llm_rank_candidates:
+            seconds += Config.COST_LLM_CALL_SECONDS + self.llm_rank_candidates / Config.LLM_REQUESTS_PER_SECOND
+        if self.full_text:
+            seconds += Config.COST_PDF_SECONDS
+        if summaries:
+            seconds += Config.COST_LLM_SUMMARY_SECONDS + summaries / Config.LLM_REQUESTS_PER_SECOND
+
+        return {
+            "llm_calls": llm_calls,
+            "pdf_downloads": Config.TOP_K_FINAL if self.full_text else 0,
+            "seconds": round(seconds, 1)
+        }
+
+    def describe(self) -> Dict:
+        return {**asdict(self), "expected_cost": self.expected_cost()}
+
+
+PLANS = {
+    # Raw query, BM25 + embeddings only, abstracts as summaries: no LLM calls at all
+    "fast": ExecutionPlan("fast", expand_query=False, llm_rank_candidates=0,
+                          full_text=False, llm_summaries=False),
+    # Reduced LLM cascade: fewer relevance calls, summaries from abstracts
+    "balanced": ExecutionPlan("balanced", expand_query=True, llm_rank_candidates=12,
+                              full_text=False, llm_summaries=True),
+    "full": ExecutionPlan("full", expand_query=True, llm_rank_candidates=Config.TOP_K_EMBEDDING,
+                          full_text=True, llm_summaries=True),
+}
+
+DEFAULT_MODE = "full"
+
+
+def get_plan(mode: str = None) -> ExecutionPlan:
+    """Execution plan for a mode name; raises ValueError for unknown modes"""
+    mode = mode or DEFAULT_MODE
+    if mode not in PLANS:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {', '.join(PLANS)}")
+    return PLANS[mode]
@@ -0,0 +1,56 @@
+"""Production server: preforked uvicorn workers.
+
+The app (ResearchWorkflow with the SentenceTransformer weights) is imported
+once in the master before forking, so workers share those pages
+copy-on-write. Workers share arXiv, embedding, PDF and LLM caches through a
+SQLite store in /dev/shm.
+
+    gunicorn -c gunicorn.conf.py main:app
+"""
+import gc
+import os
+import tempfile
+
+# Must be set before the app (and config) is imported by --preload
+os.environ.setdefault(
+    "SHARED_CACHE_PATH",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "gostomysl-cache.sqlite")
+)
+
+from config import Config  # noqa: E402
+from uvicorn_worker import UvicornWorker  # noqa: E402
+
+
+class ResearchWorker(UvicornWorker):
+    """Uvicorn worker with the server settings `main.py` passes to uvicorn.run"""
+
+    CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "ws_per_message_deflate": Config.WS_PER_MESSAGE_DEFLATE}
+
+
+bind = f"{Config.API_HOST}:{Config.API_PORT}"
+workers = Config.SERVER_WORKERS
+worker_class = ResearchWorker
+preload_app = True
+timeout = 300
+graceful_timeout = 30
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the collector's generations, so
+    # refcount/GC bookkeeping in workers does not copy the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Each worker gets its share of the CPU for torch and of the LLM folder quota
+    try:
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    except ImportError:
+        pass
+
+    from models.llm_scheduler import scheduler
+    scheduler.set_limits(
+        Config.LLM_REQUESTS_PER_SECOND / workers,
+        Config.LLM_TOKENS_PER_MINUTE / workers
+    )
@@ -1,11 +1,27 @@
 import asyncio
-import datetime
 import json
 import logging
+import math
+import os
+import tempfile
 import traceback
+from datetime import datetime
+from typing import List, Optional
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from agents.gost_formatter import GOSTFormatter
+from checkpoint import CheckpointStore
+from config import Config
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
+from models.paper import Paper
+from models.llm_scheduler import scheduler
+from pdf_downloader import downloader
+from profiling import RunProfiler, should_profile
+from pydantic import BaseModel
+from run_context import RUN_ID_RE, RunContext
+from serialization import encode_frame, resolve_encoding
+from watch import WatchStore
 from workflow import ResearchWorkflow
 
 app = FastAPI()
@@ -19,120 +35,346 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-workflow = ResearchWorkflow()
+workflow = ResearchWorkflow(CheckpointStore())
+
+@app.on_event("shutdown")
+async def close_downloader():
+    await downloader.close()
+
+watch_store = WatchStore()
+
+class WatchRequest(BaseModel):
+    name: str
+    query: str
 
 @app.get("/")
 async def root():
     return {"message": "ArXiv Research System API"}
 
+@app.get("/metrics/llm")
+async def llm_metrics():
+    return scheduler.stats()
+
+@app.get("/profiles/{run_id}")
+async def get_profile(run_id: str):
+    """Speedscope profile of a profiled run"""
+    path = os.path.join(Config.PROFILE_DIR, f"{run_id}.speedscope.json")
+    if not RUN_ID_RE.fullmatch(run_id) or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"No profile for run {run_id}")
+    return FileResponse(path, media_type="application/json", filename=os.path.basename(path))
+
+@app.get("/watches")
+async def list_watches():
+    return watch_store.list()
+
+@app.post("/watches")
+async def create_watch(request: WatchRequest):
+    try:
+        if watch_store.load(request.name) is not None:
+            raise HTTPException(status_code=409, detail="Watch already exists")
+        watch = watch_store.create(request.name, request.query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"name": watch["name"], "query": watch["query"]}
+
+@app.post("/watches/{name}/run")
+async def run_watch(name: str):
+    """Rerun a saved query, processing only papers published since the last run"""
+    try:
+        watch = watch_store.load(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if watch is None:
+        raise HTTPException(status_code=404, detail="Watch not found")
+    
+    async with watch_store.lock(name):
+        # A rerun that held the lock before us may have processed new papers
+        watch = watch_store.load(name)
+        state = await workflow.run_watch(watch)
+        watch_store.save(watch)
+    
+    return Response(encode_frame({
+        "name": name,
+        "new_candidates": len(state['raw_papers']),
+        "new_top_papers": state['new_top_papers'],
+        "document": state['final_document']
+    }), media_type="application/json")
+
+async def send_frame(websocket: WebSocket, message: dict, encoding: str = "json"):
+    """Serialize a frame once and send it as text or binary"""
+    frame = encode_frame(message, encoding)
+    if isinstance(frame, bytes):
+        await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(frame)
+
+@app.get("/bibliography/export")
+async def export_watch_bibliography(watch: Optional[List[str]] = Query(None)):
+    """Stream a de-duplicated GOST bibliography of the given (or all) watches"""
+    if watch:
+        for name in watch:
+            try:
+                if watch_store.load(name) is None:
+                    raise HTTPException(status_code=404, detail=f"Watch {name} not found")
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+    
+    # Each watch is de-duplicated already; only several watches can overlap
+    seen = set() if watch is None or len(watch) > 1 else None
+    return StreamingResponse(
+        GOSTFormatter.stream_bibliography(watch_store.iter_papers(watch), seen=seen),
+        media_type="text/markdown; charset=utf-8"
+    )
+
+def parse_paper_line(line: bytes, line_no: int) -> Paper:
+    """Parse one posted JSON line, raising ValueError if it is not a usable paper"""
+    try:
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            raise ValueError("expected a JSON object")
+        paper = Paper.from_dict(data)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Line {line_no}: {e}")
+    if not isinstance(paper.id, str) or not paper.id:
+        raise ValueError(f"Line {line_no}: id must be a non-empty string")
+    if not isinstance(paper.title, str):
+        raise ValueError(f"Line {line_no}: title must be a string")
+    for key in ("doi", "pdf_url", "journal_ref"):
+        if getattr(paper, key) is not None and not isinstance(getattr(paper, key), str):
+            raise ValueError(f"Line {line_no}: {key} must be a string or null")
+    if not isinstance(paper.authors, list) or not all(isinstance(a, str) for a in paper.authors):
+        raise ValueError(f"Line {line_no}: authors must be a list of strings")
+    if paper.published is not None and not isinstance(paper.published, datetime):
+        raise ValueError(f"Line {line_no}: published must be an ISO date")
+    return paper
+
+@app.post("/bibliography/export")
+async def export_bibliography(request: Request):
+    """Stream a GOST bibliography for papers posted as JSON lines
+    
+    Lines are validated as the body arrives, before the response starts, and
+    spooled to a temporary file so large inputs are not held in memory.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=Config.EXPORT_SPOOL_BYTES)
+    line_no = 0
+    
+    def spool_line(line: bytes):
+        nonlocal line_no
+        line_no += 1
+        if line.strip():
+            parse_paper_line(line, line_no)
+            spool.write(line + b"\n")
+    
+    try:
+        pending = b""
+        async for chunk in request.stream():
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                spool_line(line)
+        spool_line(pending)
+    except ValueError as e:
+        spool.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    spool.seek(0)
+    
+    def iter_papers():
+        with spool:
+            for line in spool:
+                yield Paper.from_dict(json.loads(line))
+    
+    return StreamingResponse(
+        GOSTFormatter.stream_bibliography(iter_papers(), seen=set()),
+        media_type="text/markdown; charset=utf-8"
+    )
+
+async def run_research(state: dict, send):
+    """Run the workflow stages for one query, streaming progress frames"""
+    await send({
+        "stage": "plan",
+        "status": state['plan'].mode,
+        "run_id": state['context'].run_id,
+        "data": state['plan'].describe()
+    })
+    
+    # Process query
+    await send({
+        "stage": "query_processing",
+        "status": "Processing query..."
+    })
+    state = await workflow.process_query_node(state)
+    await send({
+        "stage": "query_processing",
+        "status": "Complete",
+        "data": state.get('enhanced_queries')
+    })
+
+    
+    # Search papers
+    await send({
+        "stage": "searching",
+        "status": "Searching ArXiv..."
+    })
+    state = await workflow.search_papers_node(state)
+
+    await send({
+        "stage": "searching",
+        "status": "Complete",
+        "data": {
+            "count": len(state.get('raw_papers', [])),
+            "papers": state.get('raw_papers', [])[:5]  # Send first 5 for preview
+        }
+    })
+    
+
+    # Rank papers
+    await send({
+        "stage": "ranking",
+        "status": "Ranking papers..."
+    })
+    state = await workflow.rank_papers_node(state)
+    await send({
+        "stage": "ranking",
+        "status": "Complete",
+        "data": {
+            "top_papers": state.get('ranked_papers', [])[:5]
+        }
+    })
+    
+
+    # Summarize papers
+    await send({
+        "stage": "summarizing",
+        "status": "Creating summaries..."
+    })
+    state = await workflow.summarize_papers_node(state)
+    await send({
+        "stage": "summarizing",
+        "status": "Complete",
+        "data": {
+            "summaries": [
+                {"title": p.title, "summary": (p.ru_summary or '')[:200]}
+                for p in state.get('summarized_papers', [])[:3]
+            ]
+        }
+    })
+    
+    # Format document
+    await send({
+        "stage": "formatting",
+        "status": "Formatting document..."
+    })
+    state = await workflow.format_document_node(state)
+    await send({
+        "stage": "formatting",
+        "status": "Complete"
+    })
+    
+    # Send final result
+    await send({
+        "stage": "complete",
+        "status": "Research complete",
+        "data": {
+            "document": state.get('final_document'),
+            "papers": state.get('filtered_papers'),
+            "partial": state.get('partial', False),
+            "cost": state.get('cost')
+        }
+    })
+
+def parse_deadline(value) -> float:
+    """Per-query deadline in seconds; RUN_DEADLINE_SECONDS when not given"""
+    if not value:
+        return Config.RUN_DEADLINE_SECONDS
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+        raise ValueError(f"deadline must be a positive number of seconds, got {value!r}")
+    return float(value)
+
+def parse_run_id(value) -> Optional[str]:
+    """Run id to resume; only ids this server generates (uuid4 hex or a make_key sha1) are accepted"""
+    if not value:
+        return None
+    if not isinstance(value, str) or not RUN_ID_RE.fullmatch(value):
+        raise ValueError(f"Invalid run id {value!r}")
+    return value
+
+async def receive_messages(websocket: WebSocket, incoming: asyncio.Queue):
+    """Forward client messages so disconnects are noticed while a run is in progress"""
+    while True:
+        message = await websocket.receive()
+        await incoming.put(message)
+        if message["type"] == "websocket.disconnect":
+            return
+
 @app.websocket("/ws/research")
 async def research_websocket(websocket: WebSocket):
     await websocket.accept()
     
+    incoming = asyncio.Queue()
+    receiver = asyncio.create_task(receive_messages(websocket, incoming))
+    run_id = None
+    # A message that arrived just as the previous run finished
+    pending = None
+    
     try:
         while True:
             # Receive query from client
-            data = await asyncio.wait_for(websocket.receive_text(), timeout=120)
-            query_data = json.loads(data)
-            user_query = query_data['query']
+            message = pending or await asyncio.wait_for(incoming.get(), timeout=120)
+            pending = None
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            query_data = json.loads(message.get("text") or message.get("bytes"))
+            encoding = resolve_encoding(query_data.get('encoding', 'json'))
+            # Fairness is per user; the port changes with every connection, so never key on it
+            user = str(query_data.get('user') or websocket.client.host)
             
-            # Create custom workflow with progress updates
-            state = {
-                'user_query': user_query,
-                'status': 'Started'
-            }
+            async def send(message: dict):
+                await send_frame(websocket, message, encoding)
             
-
-            # Process query
-            await websocket.send_json({
-                "stage": "query_processing",
-                "status": "Processing query..."
-            })
-            state = await workflow.process_query_node(state)
-            await websocket.send_json({
-                "stage": "query_processing",
-                "status": "Complete",
-                "data": state.get('enhanced_queries')
-            })
-
-            
-            # Search papers
-            await websocket.send_json({
-                "stage": "searching",
-                "status": "Searching ArXiv..."
-            })
-            state = await workflow.search_papers_node(state)
-
-            def datetime_converter(o):
-                if isinstance(o, datetime.datetime):
-                    return o.isoformat()
-                raise TypeError("Type not serializable")
-
-            await websocket.send_json(json.loads(json.dumps({
-                "stage": "searching",
-                "status": "Complete",
-                "data": {
-                    "count": len(state.get('raw_papers', [])),
-                    "papers": state.get('raw_papers', [])[:5]  # Send first 5 for preview
-                }
-            }, default=datetime_converter)))
-            
-
-            # Rank papers
-            await websocket.send_json({
-                "stage": "ranking",
-                "status": "Ranking papers..."
-            })
-            state = await workflow.rank_papers_node(state)
-            await websocket.send_json(json.loads(json.dumps({
-                "stage": "ranking",
-                "status": "Complete",
-                "data": {
-                    "top_papers": state.get('ranked_papers', [])[:5]
-                }
-            }, default=datetime_converter)))
+            ctx = RunContext(user=user).set_timeout(parse_deadline(query_data.get('deadline')))
+            # A known run id resumes that run from its last checkpoint
+            resumed_id = parse_run_id(query_data.get('run_id'))
+            if resumed_id:
+                ctx.run_id = resumed_id
+            run_id = ctx.run_id
             
-
-            # Summarize papers
-            await websocket.send_json({
-                "stage": "summarizing",
-                "status": "Creating summaries..."
-            })
-            state = await workflow.summarize_papers_node(state)
-            await websocket.send_json({
-                "stage": "summarizing",
-                "status": "Complete",
-                "data": {
-                    "summaries": [
-                        {"title": p['title'], "summary": p.get('ru_summary', '')[:200]}
-                        for p in state.get('summarized_papers', [])[:3]
-                    ]
-                }
-            })
+            # Create custom workflow with progress updates
+            state = workflow.initial_state(query_data.get('query'), ctx, query_data.get('mode'))
+            if should_profile(bool(query_data.get('profile'))):
+                ctx.profiler = RunProfiler(ctx.run_id).start()
             
-            # Format document
-            await websocket.send_json({
-                "stage": "formatting",
-                "status": "Formatting document..."
-            })
-            state = await workflow.format_document_node(state)
-            await websocket.send_json({
-                "stage": "formatting",
-                "status": "Complete",
-                "data": {
-                    "document": state.get('final_document')
-                }
+            # Run the stages while watching for a disconnect or a cancel request
+            pipeline = asyncio.create_task(run_research(state, send))
+            next_message = asyncio.create_task(incoming.get())
+            try:
+                await asyncio.wait({pipeline, next_message}, return_when=asyncio.FIRST_COMPLETED)
+                
+                if pipeline.done():
+                    if next_message.done():
+                        pending = next_message.result()
+                    else:
+                        next_message.cancel()
+                    if pending is not None and pending["type"] == "websocket.disconnect":
+                        # Nobody is left to receive the result or an error frame
+                        pipeline.exception()
+                        raise WebSocketDisconnect(pending.get("code", 1000))
+                    pipeline.result()
+                    continue
+                
+                # Any client message during a run cancels it; abort in-flight work
+                ctx.cancel()
+                pipeline.cancel()
+                await asyncio.gather(pipeline, return_exceptions=True)
+            finally:
+                if ctx.profiler is not None:
+                    await ctx.profiler.finish()
+            message = next_message.result()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            await send({
+                "stage": "cancelled",
+                "status": "Research cancelled",
+                "run_id": run_id
             })
-            
-            # Send final result
-            await websocket.send_json(json.loads(json.dumps({
-                "stage": "complete",
-                "status": "Research complete",
-                "data": {
-                    "document": state.get('final_document'),
-                    "papers": state.get('filtered_papers')
-                }
-            }, default=datetime_converter)))
 
     except WebSocketDisconnect as e:
         # Нормальное закрытие вебсокета
@@ -141,11 +383,13 @@ async def research_websocket(websocket: WebSocket):
     except Exception as e:
         tb_str = traceback.format_exc()
         print(tb_str, flush=True)
-        await websocket.send_json({
+        await send_frame(websocket, {
             "stage": "error",
-            "status": str(e)
+            "status": str(e),
+            "run_id": run_id
         })
     finally:
+        receiver.cancel()
         try:
             await websocket.close()
         except Exception as e:
@@ -153,4 +397,9 @@ async def research_websocket(websocket: WebSocket):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        app,
+        host=Config.API_HOST,
+        port=Config.API_PORT,
+        ws_per_message_deflate=Config.WS_PER_MESSAGE_DEFLATE
+    )
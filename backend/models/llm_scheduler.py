@@ -0,0 +1,260 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from config import Config
+from models.yandex_llm import YandexGPT
+from run_context import RunContext
+
+logger = logging.getLogger("LLMScheduler")
+
+# Lower value is served first
+PRIORITY_QUERY = 0
+PRIORITY_RANKING = 1
+PRIORITY_SUMMARY = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_QUERY: "query",
+    PRIORITY_RANKING: "ranking",
+    PRIORITY_SUMMARY: "summary"
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count used for quota accounting"""
+    return max(1, len(text) // Config.LLM_CHARS_PER_TOKEN)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` units per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds to wait until `amount` units are available"""
+        self._refill()
+        # A single request larger than the bucket only waits for a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        """Take units out of the bucket; the balance may go negative as debt"""
+        self._refill()
+        self.tokens -= amount
+
+
+class _Request:
+    __slots__ = ("llm", "prompt", "priority", "user", "cost", "future", "enqueued")
+
+    def __init__(self, llm: YandexGPT, prompt: str, priority: int, user: str, future: asyncio.Future):
+        self.llm = llm
+        self.prompt = prompt
+        self.priority = priority
+        self.user = user
+        self.cost = estimate_tokens(prompt)
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class LLMScheduler:
+    """Central queue for all YandexGPT traffic
+
+    Requests are served by priority class; within a class users are
+    interleaved by start-time fair queuing on estimated tokens, so one
+    user's burst of summaries cannot starve another user's query. Dispatch
+    is throttled by requests/sec and tokens/min buckets and a concurrency
+    cap, and the blocking HTTP calls run in a dedicated pool of
+    `max_concurrency` threads, so they never queue behind PDF parsing.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = Config.LLM_REQUESTS_PER_SECOND,
+        tokens_per_minute: float = Config.LLM_TOKENS_PER_MINUTE,
+        max_concurrency: int = Config.LLM_MAX_CONCURRENCY
+    ):
+        self.max_concurrency = max_concurrency
+        # Threads start lazily, so a scheduler created before a fork is safe
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self.set_limits(requests_per_second, tokens_per_minute)
+        self._queue = []
+        self._counter = itertools.count()
+        self._virtual_time: Dict[int, float] = {}
+        self._user_finish: Dict[tuple, float] = {}
+        self._in_flight = 0
+        self._tasks = set()
+        self._metrics = {
+            priority: {"requests": 0, "cache_hits": 0, "total_wait": 0.0, "max_wait": 0.0}
+            for priority in PRIORITY_NAMES
+        }
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def set_limits(self, requests_per_second: float, tokens_per_minute: float):
+        """Replace the quota buckets, e.g. to split the folder quota between workers"""
+        self.requests_per_second = requests_per_second
+        self.tokens_per_minute = tokens_per_minute
+        self._request_bucket = TokenBucket(requests_per_second, max(1.0, requests_per_second))
+        self._token_bucket = TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+
+    def _bind_loop(self):
+        # asyncio primitives belong to one loop; rebind when a new loop
+        # (e.g. a fresh asyncio.run in batch mode) starts using the scheduler
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._dispatcher = None
+            self._queue = []
+            self._in_flight = 0
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    async def submit(self, llm: YandexGPT, prompt: str, priority: int = PRIORITY_SUMMARY,
+                     ctx: RunContext = None) -> str:
+        """Queue a prompt and wait for the completion text"""
+        ctx = ctx or RunContext()
+        cached = llm.cached_response(prompt)
+        if cached is not None:
+            self._metrics[priority]["cache_hits"] += 1
+            ctx.record("llm_cache_hits")
+            return cached
+
+        with ctx.span(f"llm {PRIORITY_NAMES[priority]}"):
+            text = await self._enqueue(llm, prompt, priority, ctx.user)
+        ctx.record("llm_calls")
+        ctx.record("llm_tokens", estimate_tokens(prompt) + estimate_tokens(text))
+        return text
+
+    async def _enqueue(self, llm: YandexGPT, prompt: str, priority: int, user: str) -> str:
+        self._bind_loop()
+        request = _Request(llm, prompt, priority, user, self._loop.create_future())
+
+        # Start-time fair queuing within the priority class
+        start = max(self._virtual_time.get(priority, 0.0), self._user_finish.get((priority, user), 0.0))
+        self._user_finish[(priority, user)] = start + request.cost
+        if len(self._user_finish) > 10000:
+            self._prune_users()
+        heapq.heappush(self._queue, (priority, start, next(self._counter), request))
+        self._wakeup.set()
+
+        return await request.future
+
+    def _prune_users(self):
+        # Users whose finish time is behind the class clock have no backlog left
+        self._user_finish = {
+            key: finish for key, finish in self._user_finish.items()
+            if finish > self._virtual_time.get(key[0], 0.0)
+        }
+
+    def _head(self) -> Optional[_Request]:
+        # Drop requests whose caller went away
+        while self._queue and self._queue[0][3].future.done():
+            heapq.heappop(self._queue)
+        return self._queue[0][3] if self._queue else None
+
+    async def _dispatch(self):
+        while True:
+            request = self._head()
+            if request is None or self._in_flight >= self.max_concurrency:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = max(
+                self._request_bucket.delay(1),
+                self._token_bucket.delay(request.cost)
+            )
+            if delay > 0:
+                # Re-pick the head afterwards: a higher priority request may arrive meanwhile
+                await asyncio.sleep(delay)
+                continue
+
+            priority, start, _, request = heapq.heappop(self._queue)
+            self._virtual_time[priority] = max(self._virtual_time.get(priority, 0.0), start)
+            self._request_bucket.consume(1)
+            self._token_bucket.consume(request.cost)
+            self._record_wait(request)
+
+            self._in_flight += 1
+            task = self._loop.create_task(self._execute(request))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def _call(request: _Request) -> Optional[str]:
+        # Skip requests whose caller went away while this one waited for a thread
+        if request.future.done():
+            return None
+        return request.llm(request.prompt)
+
+    async def _execute(self, request: _Request):
+        try:
+            text = await self._loop.run_in_executor(self._executor, self._call, request)
+            if text is None:
+                return
+            # Charge the completion once its size is known
+            self._token_bucket.consume(estimate_tokens(text))
+            if not request.future.done():
+                request.future.set_result(text)
+        except Exception as e:
+            if not request.future.done():
+                request.future.set_exception(e)
+        finally:
+            self._in_flight -= 1
+            self._wakeup.set()
+
+    def _record_wait(self, request: _Request):
+        wait = time.monotonic() - request.enqueued
+        metrics = self._metrics[request.priority]
+        metrics["requests"] += 1
+        metrics["total_wait"] += wait
+        metrics["max_wait"] = max(metrics["max_wait"], wait)
+        if wait > 1.0:
+            logger.info(
+                f"{PRIORITY_NAMES[request.priority]} request of {request.user} "
+                f"waited {wait:.2f}s in the LLM queue"
+            )
+
+    def stats(self) -> Dict:
+        """Queue-wait metrics per priority class"""
+        classes = {}
+        for priority, metrics in self._metrics.items():
+            requests = metrics["requests"]
+            classes[PRIORITY_NAMES[priority]] = {
+                "requests": requests,
+                "cache_hits": metrics["cache_hits"],
+                "mean_wait": metrics["total_wait"] / requests if requests else 0.0,
+                "max_wait": metrics["max_wait"]
+            }
+        return {
+            "queued": sum(1 for item in self._queue if not item[3].future.done()),
+            "in_flight": self._in_flight,
+            "limits": {
+                "requests_per_second": self.requests_per_second,
+                "tokens_per_minute": self.tokens_per_minute,
+                "max_concurrency": self.max_concurrency
+            },
+            "classes": classes
+        }
+
+
+# Shared by every agent in the process
+scheduler = LLMScheduler()
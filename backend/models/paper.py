@@ -0,0 +1,57 @@
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+@dataclass(slots=True)
+class Paper:
+    """Compact paper record shared by all agents"""
+
+    id: str
+    title: str
+    authors: List[str]
+    summary: str
+    published: Optional[datetime] = None
+    updated: Optional[datetime] = None
+    categories: List[str] = field(default_factory=list)
+    pdf_url: Optional[str] = None
+    doi: Optional[str] = None
+    journal_ref: Optional[str] = None
+
+    # Filled in place by later pipeline stages
+    relevance_score: Optional[float] = None
+    ru_summary: Optional[str] = None
+
+    @classmethod
+    def from_arxiv(cls, result) -> "Paper":
+        """Build a paper from an `arxiv.Result`"""
+        return cls(
+            id=result.entry_id,
+            title=result.title,
+            authors=[author.name for author in result.authors],
+            summary=result.summary,
+            published=result.published,
+            updated=result.updated,
+            categories=result.categories,
+            pdf_url=result.pdf_url,
+            doi=result.doi,
+            journal_ref=result.journal_ref
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Paper":
+        """Build a paper from its serialized form"""
+        known = {f.name for f in fields(cls)}
+        values = {key: value for key, value in data.items() if key in known}
+        for key in ("published", "updated"):
+            if isinstance(values.get(key), str):
+                values[key] = datetime.fromisoformat(values[key])
+        return cls(**values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready representation with ISO formatted dates"""
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        for key in ("published", "updated"):
+            if data[key] is not None:
+                data[key] = data[key].isoformat()
+        return data
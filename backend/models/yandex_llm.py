@@ -6,6 +6,11 @@ from langchain.callbacks.manager import CallbackManagerForLLMRun
 from pydantic import Field
 import yandexcloud
 from yandexcloud import SDK
+from cache import make_cache, make_key
+from config import Config
+
+# Responses shared by every YandexGPT instance in the process
+response_cache = make_cache("llm", Config.LLM_CACHE_SIZE)
 
 class YandexGPT(LLM):
     """YandexGPT LLM wrapper for LangChain"""
@@ -20,12 +25,29 @@ class YandexGPT(LLM):
     def _llm_type(self) -> str:
         return "yandexgpt"
     
+    def _cache_key(self, prompt: str) -> str:
+        return make_key(self.folder_id, self.temperature, self.max_tokens, prompt)
+    
+    def cached_response(self, prompt: str):
+        """Previously received completion for this prompt, if any"""
+        return response_cache.get(self._cache_key(prompt))
+    
     def _call(
         self,
         prompt: str,
         stop: List[str] = None,
         run_manager: CallbackManagerForLLMRun = None,
     ) -> str:
+        key = self._cache_key(prompt)
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        text = self._request(prompt)
+        response_cache.set(key, text)
+        return text
+    
+    def _request(self, prompt: str) -> str:
         headers = {
             "Authorization": f"Api-Key {self.api_key}",
             "Content-Type": "application/json"
@@ -49,7 +71,8 @@ class YandexGPT(LLM):
         response = requests.post(
             "https://llm.api.cloud.yandex.net/foundationModels/v1/completion",
             headers=headers,
-            json=data
+            json=data,
+            timeout=Config.LLM_REQUEST_TIMEOUT
         )
         
         if response.status_code == 200:
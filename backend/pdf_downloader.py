@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from typing import Optional
+
+import aiohttp
+from config import Config
+
+logger = logging.getLogger("PDFDownloader")
+
+
+class PDFDownloadError(Exception):
+    """The response is not a PDF or exceeds the size cap"""
+
+
+class PDFDownloader:
+    """Process-wide PDF downloader
+
+    One `aiohttp.ClientSession` is reused across papers and runs, with a
+    global and per-host connection limit and download timeouts. Bodies are
+    streamed with a byte cap, and responses that are not PDFs or are too
+    large are aborted early.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = Config.PDF_MAX_BYTES,
+        max_connections: int = Config.PDF_MAX_CONNECTIONS,
+        connections_per_host: int = Config.PDF_CONNECTIONS_PER_HOST,
+        connect_timeout: float = Config.PDF_CONNECT_TIMEOUT,
+        total_timeout: float = Config.PDF_DOWNLOAD_TIMEOUT,
+        chunk_size: int = 64 * 1024
+    ):
+        self.max_bytes = max_bytes
+        self.max_connections = max_connections
+        self.connections_per_host = connections_per_host
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, sock_connect=connect_timeout)
+        self.chunk_size = chunk_size
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # A session belongs to one event loop; batch runs may start new ones
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.connections_per_host
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._loop = loop
+        return self._session
+
+    async def fetch(self, url: str) -> bytes:
+        """Download a PDF, raising PDFDownloadError for non-PDF or oversized bodies"""
+        session = self._get_session()
+        async with session.get(url) as resp:
+            resp.raise_for_status()
+
+            content_type = resp.headers.get("Content-Type", "")
+            if content_type and not any(t in content_type for t in ("pdf", "octet-stream")):
+                raise PDFDownloadError(f"{url} returned {content_type}, not a PDF")
+            if resp.content_length is not None and resp.content_length > self.max_bytes:
+                raise PDFDownloadError(f"{url} is {resp.content_length} bytes, over the {self.max_bytes} cap")
+
+            chunks = []
+            size = 0
+            head = b""
+            async for chunk in resp.content.iter_chunked(self.chunk_size):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise PDFDownloadError(f"{url} exceeds the {self.max_bytes} byte cap")
+                chunks.append(chunk)
+
+                # Abort as soon as the first bytes show this is not a PDF
+                if len(head) < 4:
+                    head = (head + chunk).lstrip()
+                    if len(head) >= 4 and not head.startswith(b"%PDF"):
+                        raise PDFDownloadError(f"{url} does not start with a PDF header")
+
+        if not head.startswith(b"%PDF"):
+            raise PDFDownloadError(f"{url} does not start with a PDF header")
+        return b"".join(chunks)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# Shared by every run in the process
+downloader = PDFDownloader()
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger("Profiler")
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+def _is_idle(code) -> bool:
+    """Whether a thread stopped in `code` is a parked pool worker or another sampler"""
+    if code.co_filename.endswith(("threading.py", "queue.py")):
+        return True
+    # Executor workers block on their work queue in C code right inside _worker
+    return code.co_name == "_worker" and code.co_filename.endswith(os.path.join("futures", "thread.py"))
+
+
+def should_profile(requested: bool = False) -> bool:
+    """Profile when asked to, otherwise for a random sample of runs"""
+    return requested or random.random() < Config.PROFILE_SAMPLE_RATE
+
+
+class RunProfiler:
+    """Sampling profiler for a single run
+
+    Collects a sampling CPU profile of every Python thread (the event loop
+    and the executor threads running LLM calls, PDF parsing and arXiv
+    requests), a timeline of spans opened through `RunContext.span`, and
+    event-loop lag. The result is written as a speedscope file named after
+    the run id. Samples cover the whole process, so runs executing at the
+    same time show up in each other's CPU profile.
+    """
+
+    def __init__(self, run_id: str, interval: float = Config.PROFILE_INTERVAL,
+                 output_dir: str = Config.PROFILE_DIR):
+        self.run_id = run_id
+        self.interval = interval
+        self.path = os.path.join(output_dir, f"{run_id}.speedscope.json")
+        # Run ids may come from clients; never write outside the profile directory
+        if os.path.dirname(os.path.realpath(self.path)) != os.path.realpath(output_dir):
+            raise ValueError(f"Invalid run id for a profile: {run_id!r}")
+
+        self._frames: List[Dict] = []
+        self._frame_ids: Dict[Tuple, int] = {}
+        self._samples: Dict[int, List[Tuple[float, float, List[int]]]] = defaultdict(list)
+        self._thread_names: Dict[int, str] = {}
+        self._spans: List[Tuple[str, float, float]] = []
+        self._lags: List[Tuple[float, float]] = []
+
+        self._started = None
+        self._stopped = None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._lag_monitor: Optional[asyncio.Task] = None
+
+    def start(self) -> "RunProfiler":
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample, name=f"profiler-{self.run_id}", daemon=True)
+        self._sampler.start()
+        self._lag_monitor = asyncio.get_running_loop().create_task(self._monitor_lag())
+        return self
+
+    @contextmanager
+    def span(self, name: str):
+        """Record the wall time of a block on the run timeline"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._spans.append((name, start, time.perf_counter()))
+
+    def _frame(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frame_ids.get(key)
+        if index is None:
+            index = self._frame_ids[key] = len(self._frames)
+            self._frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return index
+
+    def _sample(self):
+        own = threading.get_ident()
+        previous = self._started
+        while not self._stop.wait(self.interval):
+            # Weigh each sample by the time since the previous tick, not since the
+            # thread's previous sample, so idle gaps are not charged to its stack
+            now = time.perf_counter()
+            elapsed, previous = now - previous, now
+            for ident, frame in sys._current_frames().items():
+                if ident == own or _is_idle(frame.f_code):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                self._samples[ident].append((now, elapsed, stack))
+            for thread in threading.enumerate():
+                self._thread_names.setdefault(thread.ident, thread.name)
+
+    async def _monitor_lag(self):
+        # A sleep that wakes up late means something blocked the event loop
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._lags.append((now, max(0.0, now - start - self.interval)))
+
+    async def finish(self) -> Dict:
+        """Stop sampling, write the speedscope file and return a short summary"""
+        self._stopped = time.perf_counter()
+        self._stop.set()
+        self._lag_monitor.cancel()
+        await asyncio.gather(self._lag_monitor, return_exceptions=True)
+        # The sampler wakes up within one interval
+        self._sampler.join()
+        await asyncio.get_running_loop().run_in_executor(None, self._write)
+
+        lags = sorted(lag for _, lag in self._lags)
+        summary = {
+            "path": self.path,
+            "seconds": round(self._stopped - self._started, 3),
+            "samples": sum(len(samples) for samples in self._samples.values()),
+            "loop_lag": {
+                "max": round(lags[-1], 4) if lags else 0.0,
+                "mean": round(sum(lags) / len(lags), 4) if lags else 0.0,
+                "p95": round(lags[int(0.95 * (len(lags) - 1))], 4) if lags else 0.0
+            }
+        }
+        logger.info(f"Profile of run {self.run_id} written to {self.path}: {summary}")
+        return summary
+
+    def _sampled_profiles(self) -> List[Dict]:
+        profiles = []
+        for ident, samples in self._samples.items():
+            profiles.append({
+                "type": "sampled",
+                "name": f"CPU: {self._thread_names.get(ident, ident)}",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": samples[-1][0] - self._started,
+                "samples": [stack for _, _, stack in samples],
+                "weights": [elapsed for _, elapsed, _ in samples]
+            })
+        # The busiest thread (usually the event loop) first
+        profiles.sort(key=lambda profile: -len(profile["samples"]))
+        return profiles
+
+    def _evented_profile(self, name: str, spans: List[Tuple[str, float, float]]) -> Dict:
+        events = []
+        for order, (span_name, start, end) in enumerate(spans):
+            if end <= start:
+                continue
+            key = ("span", span_name, 0)
+            index = self._frame_ids.get(key)
+            if index is None:
+                index = self._frame_ids[key] = len(self._frames)
+                self._frames.append({"name": span_name})
+            events.append((start - self._started, 1, -end, order, {"type": "O", "frame": index}))
+            events.append((end - self._started, 0, -start, -order, {"type": "C", "frame": index}))
+        # Closes before opens at the same instant, inner spans closing first
+        events.sort(key=lambda event: event[:4])
+        for at, *_, event in events:
+            event["at"] = at
+        return {
+            "type": "evented",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": self._stopped - self._started,
+            "events": [event for *_, event in events]
+        }
+
+    def _timeline_profiles(self) -> List[Dict]:
+        # Concurrent spans do not nest; spread them over lanes in which they do
+        lanes: List[Tuple[List, List]] = []
+        for span in sorted(self._spans, key=lambda span: (span[1], -span[2])):
+            for spans, open_ends in lanes:
+                while open_ends and open_ends[-1] <= span[1]:
+                    open_ends.pop()
+                if not open_ends or open_ends[-1] >= span[2]:
+                    break
+            else:
+                spans, open_ends = [], []
+                lanes.append((spans, open_ends))
+            spans.append(span)
+            open_ends.append(span[2])
+
+        profiles = [
+            self._evented_profile(f"Tasks #{number}", spans)
+            for number, (spans, _) in enumerate(lanes, 1)
+        ]
+
+        blocked = [
+            (f"event loop blocked {lag * 1000:.0f} ms", at - lag, at)
+            for at, lag in self._lags if lag >= Config.PROFILE_LAG_THRESHOLD
+        ]
+        profiles.append(self._evented_profile("Event loop lag", blocked))
+        return profiles
+
+    def _write(self):
+        profiles = self._timeline_profiles() + self._sampled_profiles()
+        document = {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": f"Run {self.run_id}",
+            "exporter": "gostomysl",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self._frames},
+            "profiles": profiles
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(document, f)
+        os.replace(tmp_path, self.path)
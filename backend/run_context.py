@@ -0,0 +1,130 @@
+import asyncio
+import re
+import time
+import uuid
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Awaitable, ContextManager, Dict, List, Optional, TypeVar
+
+from profiling import RunProfiler
+
+T = TypeVar("T")
+
+# Ids of new runs (uuid4 hex) and of batch runs (make_key sha1)
+RUN_ID_RE = re.compile(r"[0-9a-f]{32,40}")
+
+
+class RunCancelled(Exception):
+    """The client went away, nobody needs the rest of the run"""
+
+
+class DeadlineExceeded(Exception):
+    """The run's overall deadline has passed"""
+
+
+@dataclass
+class RunContext:
+    """Per-run information threaded through the workflow nodes and agents
+
+    Carries the user for LLM fairness, a cancellation flag and an overall
+    deadline (on the `time.monotonic()` clock). Stages check it to stop
+    early and return partial results when the deadline is reached. Profiled
+    runs also carry a `RunProfiler` recording the spans opened by stages.
+    """
+
+    user: str = "anonymous"
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    deadline: Optional[float] = None
+    cancelled: bool = False
+    started: float = field(default_factory=time.monotonic)
+    usage: Dict[str, int] = field(default_factory=lambda: {
+        "llm_calls": 0,
+        "llm_cache_hits": 0,
+        "llm_tokens": 0,
+        "pdf_downloads": 0
+    })
+    profiler: Optional[RunProfiler] = None
+
+    def set_timeout(self, seconds: Optional[float]) -> "RunContext":
+        self.deadline = time.monotonic() + seconds if seconds else None
+        return self
+
+    def record(self, key: str, amount: int = 1):
+        """Add to the run's actual resource usage"""
+        self.usage[key] += amount
+
+    def actual_cost(self) -> Dict:
+        return {**self.usage, "seconds": round(time.monotonic() - self.started, 1)}
+
+    def span(self, name: str) -> ContextManager:
+        """Mark a block on the profiled run's timeline; a no-op when not profiling"""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.span(name)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the deadline, None when there is no deadline"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    @property
+    def stopped(self) -> bool:
+        """Whether work for this run should stop (cancelled or out of time)"""
+        return self.cancelled or self.expired
+
+    def check(self):
+        """Raise if the run was cancelled"""
+        if self.cancelled:
+            raise RunCancelled(f"Run {self.run_id} cancelled")
+
+    async def within_deadline(self, awaitable: Awaitable[T]) -> T:
+        """Await with the remaining time budget; raises DeadlineExceeded on timeout"""
+        if self.stopped:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            self.check()
+            raise DeadlineExceeded(f"Run {self.run_id} exceeded its deadline")
+        try:
+            return await asyncio.wait_for(awaitable, self.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"Run {self.run_id} exceeded its deadline")
+
+    async def gather_partial(self, *aws: Awaitable[T]) -> List[Optional[T]]:
+        """Run awaitables concurrently until the deadline
+
+        Awaitables still running at the deadline are cancelled and yield None,
+        so callers can keep whatever finished in time.
+        """
+        tasks = [asyncio.ensure_future(aw) for aw in aws]
+        if not tasks:
+            return []
+        try:
+            _, pending = await asyncio.wait(tasks, timeout=self.remaining())
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        self.check()
+
+        results, error = [], None
+        for task in tasks:
+            # Retrieve every exception so none is reported as never retrieved
+            exception = None if task in pending else task.exception()
+            if exception is not None and error is None:
+                error = exception
+            results.append(None if task in pending or exception else task.result())
+        if error is not None:
+            raise error
+        return results
@@ -0,0 +1,42 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, Union
+
+from models.paper import Paper
+
+try:
+    import msgpack
+except ImportError:  # listed in requirements.txt; only binary frames need it
+    msgpack = None
+
+ENCODINGS = ("json", "msgpack")
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, Paper):
+        return o.to_dict()
+    if isinstance(o, datetime):
+        return o.isoformat()
+    raise TypeError(f"Type {type(o).__name__} not serializable")
+
+
+def encode_frame(message: Dict, encoding: str = "json") -> Union[str, bytes]:
+    """Serialize a websocket frame in a single pass"""
+    if encoding == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("msgpack encoding requested but msgpack is not installed")
+        return msgpack.packb(message, default=_default)
+    return json.dumps(message, default=_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def resolve_encoding(requested: str) -> str:
+    """Validate a requested frame encoding
+
+    Raises ValueError rather than silently switching to JSON, so a client
+    expecting binary frames gets an error frame instead of text it cannot parse.
+    """
+    if requested not in ENCODINGS:
+        raise ValueError(f"Unknown encoding {requested!r}, expected one of {', '.join(ENCODINGS)}")
+    if requested == "msgpack" and msgpack is None:
+        raise ValueError("msgpack encoding is not available on this server")
+    return requested
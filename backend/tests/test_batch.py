@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+from batch import load_queries
+
+
+def write_queries(path, items):
+    path.write_text("\n".join(json.dumps(item) for item in items) + "\n", encoding="utf-8")
+    return path
+
+
+def test_ids_are_assigned_and_made_file_safe(tmp_path):
+    path = write_queries(tmp_path / "queries.jsonl", [{"id": "a b", "query": "x"}, {"query": "y", "mode": "fast"}])
+
+    assert load_queries(path) == [
+        {"id": "a_b", "query": "x", "mode": None},
+        {"id": "query-2", "query": "y", "mode": "fast"}
+    ]
+
+
+@pytest.mark.parametrize("items", [
+    [{"id": "a", "query": "x"}, {"id": "a", "query": "y"}],
+    [{"id": "a b", "query": "x"}, {"id": "a/b", "query": "y"}],
+    [{"id": "query-2", "query": "x"}, {"query": "y"}]
+])
+def test_duplicate_ids_are_rejected(tmp_path, items):
+    path = write_queries(tmp_path / "queries.jsonl", items)
+
+    with pytest.raises(ValueError, match="Line 2: .* already used on line 1"):
+        load_queries(path)
@@ -0,0 +1,118 @@
+import importlib
+import json
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+import workflow
+from agents.gost_formatter import GOSTFormatter
+from models.paper import Paper
+from watch import WatchStore
+
+
+def make_paper(entry_id, title=None):
+    return Paper(id=entry_id, title=title or f"Title of {entry_id}", authors=["A. Author"], summary="")
+
+
+def numbers(text):
+    return [int(number) for number in re.findall(r"^(\d+)\. ", text, re.MULTILINE)]
+
+
+class FakeAgent:
+    pass
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    # The app keeps its checkpoints and watches relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    for name in ("QueryAgent", "SearchAgent", "RankingAgent", "SummaryAgent"):
+        monkeypatch.setattr(workflow, name, FakeAgent)
+    main = importlib.import_module("main")
+    monkeypatch.setattr(main, "watch_store", WatchStore(str(tmp_path / "watches")))
+    return TestClient(main.app), main
+
+
+def post_lines(client, papers):
+    body = "\n".join(json.dumps(paper) for paper in papers)
+    return client.post("/bibliography/export", content=body.encode("utf-8"))
+
+
+def test_numbering_continues_across_chunks():
+    papers = [make_paper(f"http://arxiv.org/abs/2101.0000{i}v1") for i in range(5)]
+
+    chunks = list(GOSTFormatter.stream_bibliography(papers, chunk_size=2))
+
+    assert len(chunks) == 4
+    assert numbers("".join(chunks)) == [1, 2, 3, 4, 5]
+    assert numbers("".join(GOSTFormatter.stream_bibliography(papers, chunk_size=2, start=10))) == [10, 11, 12, 13, 14]
+
+
+def test_shared_seen_set_dedupes_versions_across_documents():
+    seen = set()
+    first = [make_paper("http://arxiv.org/abs/2101.00001v1"), make_paper("http://arxiv.org/abs/2101.00002v2")]
+    second = [
+        make_paper("http://arxiv.org/abs/2101.00001v2"),
+        make_paper("http://arxiv.org/abs/2101.00003v1"),
+        make_paper("http://arxiv.org/abs/2101.00002v1")
+    ]
+
+    first_text = "".join(GOSTFormatter.stream_bibliography(first, seen=seen))
+    second_text = "".join(GOSTFormatter.stream_bibliography(second, start=3, seen=seen, header=False))
+
+    assert numbers(first_text) == [1, 2]
+    assert numbers(second_text) == [3]
+    assert "2101.00003v1" not in first_text and "Title of http://arxiv.org/abs/2101.00003v1" in second_text
+
+
+def test_post_export_streams_numbered_entries(client):
+    client, _ = client
+    papers = [make_paper(f"p{i}").to_dict() for i in range(3)]
+    papers.append(make_paper("p1").to_dict())
+
+    response = post_lines(client, papers)
+
+    assert response.status_code == 200
+    assert numbers(response.text) == [1, 2, 3]
+
+
+def test_post_export_reflects_the_posted_data(client):
+    client, _ = client
+    for _ in range(2):
+        post_lines(client, [make_paper("p1", "First title").to_dict()])
+
+    response = post_lines(client, [make_paper("p1", "Totally different title").to_dict()])
+
+    assert "Totally different title" in response.text
+    assert "First title" not in response.text
+
+
+@pytest.mark.parametrize("bad_line", [
+    {"id": 123, "title": "Int id", "authors": ["A"], "summary": ""},
+    {"id": "p2", "title": "No authors list", "authors": "A", "summary": ""},
+    {"id": "p2", "title": "Bad DOI", "authors": ["A"], "summary": "", "doi": 10},
+    {"id": "p2", "title": "Bad date", "authors": ["A"], "summary": "", "published": "yesterday"},
+    ["not", "an", "object"]
+])
+def test_post_export_rejects_bad_lines_before_responding(client, bad_line):
+    client, _ = client
+
+    response = post_lines(client, [make_paper("p1").to_dict(), bad_line])
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Line 2:")
+
+
+def test_get_export_dedupes_across_watches(client):
+    client, main = client
+    for name, ids in (("a", ["2101.00001v1", "2101.00002v1"]), ("b", ["2101.00002v2", "2101.00003v1"])):
+        watch = main.watch_store.new_watch(name, name)
+        watch["top_papers"] = [make_paper(f"http://arxiv.org/abs/{i}").to_dict() for i in ids]
+        main.watch_store.save(watch)
+
+    response = client.get("/bibliography/export", params=[("watch", "a"), ("watch", "b")])
+
+    assert response.status_code == 200
+    assert numbers(response.text) == [1, 2, 3]
+    assert client.get("/bibliography/export", params={"watch": "missing"}).status_code == 404
@@ -0,0 +1,136 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import workflow
+from checkpoint import CheckpointStore
+from models.paper import Paper
+from run_context import RunContext
+
+
+def make_papers(count):
+    return [
+        Paper(
+            id=f"http://arxiv.org/abs/2101.0000{i}v1",
+            title=f"Paper {i}",
+            authors=["A. Author"],
+            summary=f"Abstract {i}",
+            published=datetime(2021, 1, i + 1)
+        )
+        for i in range(count)
+    ]
+
+
+class FakeQueryAgent:
+    def raw_query(self, user_query):
+        return {"enhanced_queries": [user_query], "arxiv_queries": [user_query], "keywords": []}
+
+    async def process_query(self, user_query, ctx=None):
+        return self.raw_query(user_query)
+
+
+class FakeSearchAgent:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    async def search_multiple_queries(self, queries, since=None, ctx=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return make_papers(5)
+
+
+class FakeRankingAgent:
+    def __init__(self):
+        self.calls = 0
+
+    async def multi_stage_ranking(self, papers, query, ctx=None, llm_candidates=0):
+        self.calls += 1
+        return papers
+
+
+class FakeSummaryAgent:
+    """Summarizes papers one by one, failing on the `fail_at`-th call"""
+
+    def __init__(self, fail_at=None):
+        self.summarized = []
+        self.fail_at = fail_at
+
+    async def summarize_papers(self, papers, ctx=None, full_text=True, use_llm=True, on_summarized=None):
+        for paper in papers:
+            if len(self.summarized) + 1 == self.fail_at:
+                raise RuntimeError("LLM unavailable")
+            self.summarized.append(paper.id)
+            paper.ru_summary = f"Summary of {paper.title}"
+            if on_summarized is not None:
+                on_summarized(paper)
+        return papers
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+
+
+@pytest.fixture
+def research(monkeypatch, store):
+    monkeypatch.setattr(workflow, "QueryAgent", FakeQueryAgent)
+    monkeypatch.setattr(workflow, "SearchAgent", FakeSearchAgent)
+    monkeypatch.setattr(workflow, "RankingAgent", FakeRankingAgent)
+    monkeypatch.setattr(workflow, "SummaryAgent", FakeSummaryAgent)
+    return workflow.ResearchWorkflow(store)
+
+
+def test_store_round_trip(store):
+    papers = make_papers(2)
+    papers[0].ru_summary = "Готово"
+    store.save_stage("run", "mode", "fast")
+    store.save_stage("run", "ranked_papers", papers)
+    store.save_summary("run", papers[0])
+
+    state = store.load("run")
+
+    assert state["mode"] == "fast"
+    assert state["ranked_papers"] == papers
+    assert state["summaries"] == {papers[0].id: "Готово"}
+    assert store.load("other") is None
+
+
+def test_resume_only_redoes_missing_summaries(research, store):
+    research.summary_agent.fail_at = 3
+    ctx = RunContext()
+    with pytest.raises(RuntimeError):
+        asyncio.run(research.run("graph learning", ctx, "balanced"))
+    assert len(store.load(ctx.run_id)["summaries"]) == 2
+
+    research.summary_agent = FakeSummaryAgent()
+    result = asyncio.run(research.run(None, RunContext(run_id=ctx.run_id)))
+
+    papers = make_papers(5)
+    assert research.search_agent.calls == 1
+    assert research.ranking_agent.calls == 1
+    assert research.summary_agent.summarized == [paper.id for paper in papers[2:]]
+    assert result["user_query"] == "graph learning"
+    assert result["plan"].mode == "balanced"
+    assert [paper.ru_summary for paper in result["summarized_papers"]] == [
+        f"Summary of {paper.title}" for paper in papers
+    ]
+
+
+def test_outputs_cut_short_by_the_deadline_are_not_saved(research, store):
+    research.search_agent.delay = 0.1
+    ctx = RunContext().set_timeout(0.05)
+
+    result = asyncio.run(research.run("graph learning", ctx, "fast"))
+
+    assert result["partial"]
+    saved = store.load(ctx.run_id)
+    # Query expansion finished in time; the search and everything after it did not
+    assert {"user_query", "mode", "enhanced_queries"} <= saved.keys()
+    assert not saved.keys() & {"raw_papers", "ranked_papers", "summarized_papers"}
+
+
+def test_resume_of_unknown_run_fails(research):
+    with pytest.raises(ValueError):
+        research.initial_state(None, RunContext())
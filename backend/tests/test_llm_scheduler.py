@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+import pytest
+
+from models.llm_scheduler import (
+    PRIORITY_QUERY, PRIORITY_RANKING, PRIORITY_SUMMARY, LLMScheduler, TokenBucket
+)
+from run_context import RunContext
+
+
+class FakeLLM:
+    """Records prompts in call order; the first call blocks until released"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def cached_response(self, prompt):
+        return None
+
+    def __call__(self, prompt):
+        self.calls.append(prompt)
+        if len(self.calls) == 1:
+            self.release.wait(5)
+        return f"answer to {prompt}"
+
+
+async def run_queued(requests):
+    """Occupy the only slot, queue `requests` behind it and return the call order"""
+    scheduler = LLMScheduler(requests_per_second=1000, tokens_per_minute=10 ** 9, max_concurrency=1)
+    llm = FakeLLM()
+    blocker = asyncio.create_task(scheduler.submit(llm, "blocker", PRIORITY_SUMMARY, RunContext(user="x")))
+    while not llm.calls:
+        await asyncio.sleep(0.01)
+
+    tasks = [
+        asyncio.create_task(scheduler.submit(llm, prompt, priority, RunContext(user=user)))
+        for prompt, priority, user in requests
+    ]
+    await asyncio.sleep(0.05)
+    llm.release.set()
+    await asyncio.gather(blocker, *tasks)
+    return llm.calls[1:]
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(rate=1.0, capacity=10.0)
+    assert bucket.delay(5) == 0.0
+
+    bucket.consume(10)
+    assert bucket.delay(5) == pytest.approx(5.0, abs=0.05)
+    # Requests larger than the bucket only wait for a full bucket
+    assert bucket.delay(100) == pytest.approx(10.0, abs=0.05)
+
+
+def test_higher_priority_is_served_first():
+    order = asyncio.run(run_queued([
+        ("summary", PRIORITY_SUMMARY, "a"),
+        ("ranking", PRIORITY_RANKING, "a"),
+        ("query", PRIORITY_QUERY, "a")
+    ]))
+
+    assert order == ["query", "ranking", "summary"]
+
+
+def test_users_are_interleaved_within_a_priority_class():
+    order = asyncio.run(run_queued([
+        ("a1", PRIORITY_SUMMARY, "a"),
+        ("a2", PRIORITY_SUMMARY, "a"),
+        ("a3", PRIORITY_SUMMARY, "a"),
+        ("b1", PRIORITY_SUMMARY, "b")
+    ]))
+
+    # b's single request is not queued behind a's whole burst
+    assert order == ["a1", "b1", "a2", "a3"]
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+from agents.normalizer import CandidateNormalizer
+from models.paper import Paper
+
+ABSTRACT = (
+    "We study retrieval augmented generation for scientific question answering "
+    "and propose a ranking model that combines sparse lexical matching with dense "
+    "embeddings of paper abstracts. Experiments on three benchmarks show that the "
+    "hybrid ranker improves recall of relevant papers while keeping latency low, "
+    "and an ablation confirms that both signals contribute to the final quality."
+)
+
+
+def make_paper(entry_id: str, title: str = "Hybrid ranking for scientific QA",
+               summary: str = ABSTRACT, updated: datetime = None) -> Paper:
+    return Paper(id=entry_id, title=title, authors=["A. Author"], summary=summary, updated=updated)
+
+
+def test_split_version():
+    assert CandidateNormalizer.split_version("http://arxiv.org/abs/2101.00001v12") == ("http://arxiv.org/abs/2101.00001", 12)
+    assert CandidateNormalizer.split_version("http://arxiv.org/abs/2101.00001") == ("http://arxiv.org/abs/2101.00001", 0)
+
+
+def test_collapse_versions_keeps_latest():
+    normalizer = CandidateNormalizer()
+    papers = [
+        make_paper("http://arxiv.org/abs/2101.00001v2"),
+        make_paper("http://arxiv.org/abs/2101.00001v3"),
+        make_paper("http://arxiv.org/abs/2101.00001v1"),
+        make_paper("http://arxiv.org/abs/2102.00002v1", title="Another paper", summary="Unrelated text")
+    ]
+
+    collapsed = normalizer.collapse_versions(papers)
+
+    assert [paper.id for paper in collapsed] == [
+        "http://arxiv.org/abs/2101.00001v3",
+        "http://arxiv.org/abs/2102.00002v1"
+    ]
+
+
+def test_near_duplicates_are_merged_into_the_most_recent():
+    normalizer = CandidateNormalizer()
+    older = make_paper("http://arxiv.org/abs/2101.00001v1", updated=datetime(2021, 1, 1))
+    newer = make_paper(
+        "http://arxiv.org/abs/2105.00005v1",
+        summary=ABSTRACT.replace("three benchmarks", "three public benchmarks"),
+        updated=datetime(2021, 5, 1)
+    )
+
+    assert normalizer.collapse_near_duplicates([older, newer]) == [newer]
+
+
+def test_distinct_abstracts_are_kept():
+    normalizer = CandidateNormalizer()
+    first = make_paper("http://arxiv.org/abs/2101.00001v1")
+    second = make_paper(
+        "http://arxiv.org/abs/2101.00002v1",
+        title="Hybrid ranking for scientific QA",
+        summary=(
+            "A survey of graph neural networks for molecule property prediction, "
+            "covering message passing architectures, pretraining objectives and "
+            "the datasets used to compare them across chemistry tasks."
+        )
+    )
+
+    assert normalizer.collapse_near_duplicates([first, second]) == [first, second]
+
+
+def test_empty_text_papers_are_kept_and_not_merged():
+    normalizer = CandidateNormalizer()
+    empty = [make_paper(f"http://arxiv.org/abs/2101.0000{i}v1", title="", summary="") for i in range(2)]
+    regular = make_paper("http://arxiv.org/abs/2101.00009v1")
+
+    assert normalizer.signature(empty[0]) is None
+    assert normalizer.normalize(empty + [regular]) == empty + [regular]
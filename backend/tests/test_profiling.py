@@ -0,0 +1,29 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from profiling import RunProfiler
+
+
+@pytest.mark.parametrize("run_id", ["../outside", "../../../../tmp/pwnd", "/tmp/pwnd", "nested/run"])
+def test_profile_path_stays_in_output_dir(tmp_path, run_id):
+    with pytest.raises(ValueError):
+        RunProfiler(run_id, output_dir=str(tmp_path / "profiles"))
+
+
+def test_profile_is_written_to_output_dir(tmp_path):
+    async def main():
+        profiler = RunProfiler("0123abcd", interval=0.001, output_dir=str(tmp_path)).start()
+        with profiler.span("stage"):
+            await asyncio.sleep(0.02)
+        return await profiler.finish()
+
+    summary = asyncio.run(main())
+
+    assert summary["path"] == os.path.join(str(tmp_path), "0123abcd.speedscope.json")
+    with open(summary["path"], encoding="utf-8") as f:
+        document = json.load(f)
+    assert any(frame["name"] == "stage" for frame in document["shared"]["frames"])
+    assert os.listdir(tmp_path) == ["0123abcd.speedscope.json"]
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from run_context import DeadlineExceeded, RunCancelled, RunContext
+
+
+async def value_after(value, seconds):
+    await asyncio.sleep(seconds)
+    return value
+
+
+def test_gather_partial_returns_none_for_unfinished_work():
+    async def main():
+        ctx = RunContext().set_timeout(0.1)
+        slow = asyncio.ensure_future(value_after("slow", 10))
+        results = await ctx.gather_partial(value_after("fast", 0), slow)
+        return results, slow
+
+    results, slow = asyncio.run(main())
+
+    assert results == ["fast", None]
+    assert slow.cancelled()
+
+
+def test_gather_partial_without_deadline_waits_for_everything():
+    ctx = RunContext()
+    results = asyncio.run(ctx.gather_partial(value_after(1, 0.01), value_after(2, 0)))
+
+    assert results == [1, 2]
+
+
+def test_gather_partial_raises_when_cancelled():
+    async def main():
+        ctx = RunContext()
+        ctx.cancel()
+        await ctx.gather_partial(value_after(1, 0))
+
+    with pytest.raises(RunCancelled):
+        asyncio.run(main())
+
+
+def test_within_deadline_raises_on_timeout():
+    ctx = RunContext().set_timeout(0.05)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(ctx.within_deadline(value_after(1, 10)))
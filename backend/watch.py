@@ -0,0 +1,106 @@
+import asyncio
+import fcntl
+import json
+import os
+import re
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from config import Config
+from models.paper import Paper
+
+
+class WatchStore:
+    """File-backed store of saved queries ("watches")
+
+    Each watch remembers the papers it already processed (base arXiv id ->
+    `updated` timestamp), its current top papers with their summaries and
+    the time of the last run, so a rerun only handles new publications.
+    """
+
+    def __init__(self, directory: str = Config.WATCH_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, name: str) -> Path:
+        if not re.fullmatch(r"[\w.-]+", name):
+            raise ValueError(f"Invalid watch name: {name!r}")
+        return self.directory / f"{name}.json"
+
+    @asynccontextmanager
+    async def lock(self, name: str, poll_interval: float = 0.5):
+        """Hold an exclusive lock on a watch across all worker processes
+
+        The lock is an flock on `<name>.lock`, which also excludes other
+        holders in the same process. It is polled rather than waited on,
+        so a long rerun elsewhere does not block the event loop.
+        """
+        path = self._path(name).with_suffix(".lock")
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(poll_interval)
+            yield
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+
+    @staticmethod
+    def new_watch(name: str, query: str) -> Dict:
+        return {
+            "name": name,
+            "query": query,
+            "created": datetime.now().isoformat(),
+            "last_run": None,
+            "enhanced_queries": None,
+            "processed": {},
+            "top_papers": [],
+            "document": None
+        }
+
+    def create(self, name: str, query: str) -> Dict:
+        watch = self.new_watch(name, query)
+        self.save(watch)
+        return watch
+
+    def load(self, name: str) -> Optional[Dict]:
+        path = self._path(name)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def save(self, watch: Dict) -> None:
+        path = self._path(watch["name"])
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(watch, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def iter_papers(self, names: Optional[Iterable[str]] = None) -> Iterator[Paper]:
+        """Yield the top papers of the given watches (all watches by default)"""
+        if names is None:
+            names = [path.stem for path in sorted(self.directory.glob("*.json"))]
+        for name in names:
+            watch = self.load(name)
+            if watch is None:
+                continue
+            for data in watch["top_papers"]:
+                yield Paper.from_dict(data)
+
+    def list(self) -> List[Dict]:
+        watches = []
+        for path in sorted(self.directory.glob("*.json")):
+            watch = json.loads(path.read_text(encoding="utf-8"))
+            watches.append({
+                "name": watch["name"],
+                "query": watch["query"],
+                "last_run": watch["last_run"],
+                "processed": len(watch["processed"]),
+                "top_papers": len(watch["top_papers"])
+            })
+        return watches
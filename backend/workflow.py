@@ -1,18 +1,37 @@
-from typing import Dict
+import functools
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
 
 from agents.gost_formatter import GOSTFormatter
+from agents.normalizer import CandidateNormalizer
 from agents.query_agent import QueryAgent
 from agents.ranking_agent import RankingAgent
 from agents.search_agent import SearchAgent
 from agents.summary_agent import SummaryAgent
+from checkpoint import CheckpointStore
+from config import Config
+from execution_plan import ExecutionPlan, get_plan
+from models.paper import Paper
+from run_context import RunContext
 
 from langgraph.graph import END, Graph
 
 
+def _stage(node):
+    """Show a workflow node as one span on the profiled run's timeline"""
+    @functools.wraps(node)
+    async def wrapper(self, state: Dict) -> Dict:
+        ctx = state.setdefault('context', RunContext())
+        with ctx.span(node.__name__[:-len('_node')]):
+            return await node(self, state)
+    return wrapper
+
+
 class ResearchWorkflow:
     """Main workflow orchestrator using LangGraph"""
     
-    def __init__(self):
+    def __init__(self, checkpoints: Optional[CheckpointStore] = None):
+        self.checkpoints = checkpoints
         self.query_agent = QueryAgent()
         self.search_agent = SearchAgent()
         self.ranking_agent = RankingAgent()
@@ -44,53 +63,225 @@ class ResearchWorkflow:
         
         return workflow.compile()
     
+    @staticmethod
+    def _context(state: Dict) -> RunContext:
+        """Run context of the state; raises if the run was cancelled"""
+        ctx = state.setdefault('context', RunContext())
+        ctx.check()
+        return ctx
+    
+    @staticmethod
+    def _plan(state: Dict) -> ExecutionPlan:
+        return state.get('plan') or get_plan()
+    
+    def initial_state(self, user_query: Optional[str], ctx: RunContext = None, mode: str = None) -> Dict:
+        """Workflow state for a new run, or for resuming the checkpointed run `ctx.run_id`
+        
+        A resumed run keeps its original query and mode; stages completed
+        before the failure are restored instead of recomputed.
+        """
+        ctx = ctx or RunContext()
+        checkpoint = self.checkpoints.load(ctx.run_id) if self.checkpoints else None
+        if checkpoint:
+            user_query = checkpoint['user_query']
+            mode = checkpoint['mode']
+        elif not user_query:
+            raise ValueError(f"No checkpoint for run {ctx.run_id}")
+        
+        plan = get_plan(mode)
+        if self.checkpoints and not checkpoint:
+            self.checkpoints.save_stage(ctx.run_id, 'user_query', user_query)
+            self.checkpoints.save_stage(ctx.run_id, 'mode', plan.mode)
+        
+        return {
+            'user_query': user_query,
+            'context': ctx,
+            'plan': plan,
+            'checkpoint': checkpoint or {},
+            'status': 'Resumed' if checkpoint else 'Started'
+        }
+    
+    @staticmethod
+    def _restore(state: Dict, key: str) -> bool:
+        """Take a stage output from the run's checkpoint, if it was saved"""
+        saved = state.get('checkpoint') or {}
+        if key not in saved:
+            return False
+        state[key] = saved[key]
+        return True
+    
+    def _save(self, state: Dict, key: str):
+        # Outputs cut short by the deadline are recomputed on resume, not saved
+        if self.checkpoints is None or 'checkpoint' not in state or state['context'].expired:
+            return
+        self.checkpoints.save_stage(state['context'].run_id, key, state[key])
+    
+    @_stage
     async def process_query_node(self, state: Dict) -> Dict:
         """Process user query"""
-        enhanced = self.query_agent.process_query(state['user_query'])
+        ctx = self._context(state)
+        if self._restore(state, 'enhanced_queries'):
+            return state
+        if self._plan(state).expand_query:
+            enhanced = await self.query_agent.process_query(state['user_query'], ctx)
+        else:
+            enhanced = self.query_agent.raw_query(state['user_query'])
         state['enhanced_queries'] = enhanced
+        self._save(state, 'enhanced_queries')
         state['status'] = "Query processed"
         return state
     
+    @_stage
     async def search_papers_node(self, state: Dict) -> Dict:
         """Search for papers"""
+        ctx = self._context(state)
+        if self._restore(state, 'raw_papers'):
+            return state
         queries = state['enhanced_queries']['arxiv_queries']
-        papers = await self.search_agent.search_multiple_queries(queries)
+        papers = await self.search_agent.search_multiple_queries(queries, ctx=ctx)
         state['raw_papers'] = papers
+        self._save(state, 'raw_papers')
         state['status'] = f"Found {len(papers)} papers"
         return state
     
+    @_stage
     async def rank_papers_node(self, state: Dict) -> Dict:
         """Rank papers"""
+        ctx = self._context(state)
+        if self._restore(state, 'ranked_papers'):
+            return state
         papers = state['raw_papers']
         query = state['user_query']
-        ranked = await self.ranking_agent.multi_stage_ranking(papers, query)
+        ranked = await self.ranking_agent.multi_stage_ranking(
+            papers, query, ctx, llm_candidates=self._plan(state).llm_rank_candidates
+        )
         state['ranked_papers'] = ranked
+        self._save(state, 'ranked_papers')
         state['status'] = f"Ranked top {len(ranked)} papers"
         return state
     
+    @_stage
     async def summarize_papers_node(self, state: Dict) -> Dict:
         """Summarize papers"""
+        ctx = self._context(state)
+        if self._restore(state, 'summarized_papers'):
+            return state
         papers = state['ranked_papers']
-        summarized = await self.summary_agent.summarize_papers(papers)
-        state['summarized_papers'] = summarized
+        plan = self._plan(state)
+        
+        # Keep summaries finished before an interruption, checkpoint new ones one by one
+        saved = (state.get('checkpoint') or {}).get('summaries', {})
+        for paper in papers:
+            if paper.ru_summary is None:
+                paper.ru_summary = saved.get(paper.id)
+        on_summarized = None
+        if self.checkpoints is not None and 'checkpoint' in state:
+            on_summarized = lambda paper: self.checkpoints.save_summary(ctx.run_id, paper)
+        
+        pending = [paper for paper in papers if paper.ru_summary is None]
+        await self.summary_agent.summarize_papers(
+            pending, ctx, full_text=plan.full_text, use_llm=plan.llm_summaries,
+            on_summarized=on_summarized
+        )
+        state['summarized_papers'] = papers
+        if all(paper.ru_summary is not None for paper in papers):
+            self._save(state, 'summarized_papers')
         state['status'] = "Papers summarized"
         return state
     
+    @_stage
     async def format_document_node(self, state: Dict) -> Dict:
         """Format final document"""
+        ctx = self._context(state)
         papers = state['summarized_papers']
         
         document = self.formatter.format_full_document(papers)
         state['final_document'] = document
+        # Stages cut short by the deadline leave partial results behind
+        state['partial'] = ctx.expired
+        plan = self._plan(state)
+        state['cost'] = {
+            'mode': plan.mode,
+            'expected': plan.expected_cost(),
+            'actual': ctx.actual_cost()
+        }
         state['status'] = "Document formatted"
         return state
     
-    async def run(self, user_query: str) -> Dict:
+    async def run(self, user_query: str, ctx: RunContext = None, mode: str = None) -> Dict:
         """Run the complete workflow"""
-        initial_state = {
-            'user_query': user_query,
+        initial_state = self.initial_state(user_query, ctx, mode)
+        result = await self.graph.ainvoke(initial_state)
+        return result
+    
+    async def run_watch(self, watch: Dict, ctx: RunContext = None) -> Dict:
+        """Rerun a saved query, processing only newly published papers
+        
+        New candidates are ranked against the stored top set; only papers
+        that newly enter the top-K are summarized. The watch is updated in place.
+        """
+        state = {
+            'user_query': watch['query'],
+            'context': ctx or RunContext(user=f"watch:{watch['name']}"),
             'status': 'Started'
         }
         
-        result = await self.graph.ainvoke(initial_state)
-        return result
+        # Reuse the query expansion of the first run
+        if watch.get('enhanced_queries'):
+            state['enhanced_queries'] = watch['enhanced_queries']
+        else:
+            state = await self.process_query_node(state)
+        
+        since = None
+        if watch.get('last_run'):
+            since = datetime.fromisoformat(watch['last_run']) - timedelta(days=Config.WATCH_OVERLAP_DAYS)
+        
+        queries = state['enhanced_queries']['arxiv_queries']
+        papers = await self.search_agent.search_multiple_queries(queries, since=since, ctx=state['context'])
+        
+        processed = watch['processed']
+        new_papers = [
+            paper for paper in papers
+            if processed.get(CandidateNormalizer.base_id(paper.id)) != _isoformat(paper.updated)
+        ]
+        
+        # Rank only new candidates, then merge them with the stored top set
+        query = state['user_query']
+        candidates = self.ranking_agent.rank_bm25(new_papers, query, Config.TOP_K_BM25)
+        candidates = self.ranking_agent.rank_embeddings(candidates, query, Config.TOP_K_EMBEDDING)
+        candidates = await self.ranking_agent.score_with_llm(candidates, query, state['context'])
+        
+        new_ids = {CandidateNormalizer.base_id(paper.id) for paper in candidates}
+        stored = [
+            Paper.from_dict(data) for data in watch['top_papers']
+            if CandidateNormalizer.base_id(data['id']) not in new_ids
+        ]
+        merged = sorted(
+            stored + candidates,
+            key=lambda p: p.relevance_score if p.relevance_score is not None else 0.0,
+            reverse=True
+        )[:Config.TOP_K_FINAL]
+        
+        # Summarize only papers that newly entered the top-K
+        entering = [paper for paper in merged if paper.ru_summary is None]
+        await self.summary_agent.summarize_papers(entering, state['context'])
+        
+        for paper in new_papers:
+            processed[CandidateNormalizer.base_id(paper.id)] = _isoformat(paper.updated)
+        
+        state['raw_papers'] = new_papers
+        state['ranked_papers'] = merged
+        state['summarized_papers'] = merged
+        state['new_top_papers'] = entering
+        state = await self.format_document_node(state)
+        
+        watch['enhanced_queries'] = state['enhanced_queries']
+        watch['last_run'] = datetime.now(timezone.utc).isoformat()
+        watch['top_papers'] = [paper.to_dict() for paper in merged]
+        watch['document'] = state['final_document']
+        
+        return state
+
+
+def _isoformat(value: datetime) -> str:
+    return value.isoformat() if value else None
@@ -2,6 +2,7 @@ import streamlit as st
 import asyncio
 import websockets
 import json
+import uuid
 from datetime import datetime
 
 st.set_page_config(
@@ -30,6 +31,10 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Stable id of this session, used by the backend to share LLM capacity fairly
+if "user_id" not in st.session_state:
+    st.session_state["user_id"] = uuid.uuid4().hex
+
 st.title("🔬 Гостомысл Research System")
 st.markdown("### Многоагентная система поиска и анализа научных статей")
 
@@ -37,6 +42,16 @@ st.markdown("### Многоагентная система поиска и ан
 with st.sidebar:
     st.header("Настройки")
     api_url = st.text_input("Backend URL", value="ws://localhost:8000/ws/research")
+    mode = st.selectbox(
+        "Режим",
+        options=["full", "balanced", "fast"],
+        format_func=lambda m: {
+            "full": "Полный (PDF + LLM)",
+            "balanced": "Сбалансированный",
+            "fast": "Быстрый (без LLM)"
+        }[m]
+    )
+    profile = st.checkbox("Профилировать запуск", value=False)
     
     st.markdown("---")
     st.markdown("### О системе")
@@ -80,8 +95,17 @@ if st.button("🔍 Начать исследование", type="primary"):
         async def run_research():
             try:
                 async with websockets.connect(api_url, ping_timeout=180) as websocket:
-                    # Send query
-                    await websocket.send(json.dumps({"query": query}))
+                    # Send query; an unfinished run of the same query resumes from its checkpoint
+                    request = {
+                        "query": query,
+                        "mode": mode,
+                        "profile": profile,
+                        "user": st.session_state["user_id"]
+                    }
+                    last_run = st.session_state.get("last_run")
+                    if last_run and last_run["query"] == query and last_run["mode"] == mode:
+                        request["run_id"] = last_run["run_id"]
+                    await websocket.send(json.dumps(request))
                     
                     # Receive updates
                     while True:
@@ -128,9 +152,24 @@ if st.button("🔍 Начать исследование", type="primary"):
                                     f"⏳ {stages[stage]['name']}: {status}"
                                 )
                         
+                        elif stage == "plan":
+                            st.session_state["last_run"] = {
+                                "query": query, "mode": mode, "run_id": data.get("run_id")
+                            }
+                        
                         elif stage == "complete":
+                            st.session_state.pop("last_run", None)
                             # Show final results
                             results_placeholder.success("🎉 Исследование завершено!")
+                            if data["data"].get("partial"):
+                                st.warning("Время на исследование истекло — показаны частичные результаты")
+                            cost = data["data"].get("cost")
+                            if cost:
+                                st.caption(
+                                    f"Режим: {cost['mode']} · время: {cost['actual']['seconds']} с "
+                                    f"(ожидалось ~{cost['expected']['seconds']} с) · "
+                                    f"вызовов LLM: {cost['actual']['llm_calls']}"
+                                )
                             
                             # Display document
                             st.markdown("---")
@@ -153,6 +192,8 @@ if st.button("🔍 Начать исследование", type="primary"):
                         
                         elif stage == "error":
                             st.error(f"Ошибка: {status}")
+                            if st.session_state.get("last_run"):
+                                st.info("Нажмите «Начать исследование» ещё раз, чтобы продолжить с места остановки")
                             break
             
             except Exception as e: